@@ -0,0 +1,98 @@
+"""
+CPU cost decode + validasi batch ingest (default 50 event per request):
+
+- /publish: json.loads body, validasi PublishRequest (seperti FastAPI), lalu
+  Event(**event.dict()) per event (validasi ganda sebelum perbaikan)
+- /publish sekarang: json.loads + validasi PublishRequest saja
+- EVENT_LIST_ADAPTER.validate_json langsung dari bytes (parser JSON pydantic-core)
+- /publish/batch: json_codec.loads (orjson + cek integer di luar 64-bit) +
+  EVENT_LIST_ADAPTER.validate_python
+
+Pada pydantic 2.5 validate_json lebih lambat dari orjson + validate_python
+untuk payload Dict[str, Any], sehingga /publish/batch memakai yang kedua.
+Cek integer besar (walk hasil parse mencari float di luar rentang int64)
+membuat json_codec.loads kira-kira setara json.loads, bukan 2x lebih cepat.
+
+Dengan --profile setiap jalur juga dijalankan di bawah cProfile dan fungsi
+teratas (cumulative) dicetak.
+    python -m benchmarks.bench_ingest_decode --batch-size 50 --iterations 20000 --profile
+"""
+
+import argparse
+import cProfile
+import json
+import pstats
+import time
+
+from fastapi.encoders import jsonable_encoder
+
+from src import json_codec
+from src.main import decode_event_batch
+from src.models import EVENT_LIST_ADAPTER, Event, PublishRequest
+from publisher.main import generate_event
+
+
+def publish_double_validation(body: bytes):
+    request = PublishRequest.model_validate(json.loads(body))
+    return [Event(**event.dict()) for event in request.get_events()]
+
+
+def publish_single_validation(body: bytes):
+    return PublishRequest.model_validate(json.loads(body)).get_events()
+
+
+def adapter_validate_json(body: bytes):
+    return EVENT_LIST_ADAPTER.validate_json(body)
+
+
+def publish_batch(body: bytes):
+    validated, _ = decode_event_batch(body)
+    return validated
+
+
+def report(name: str, iterations: int, batch_size: int, elapsed: float):
+    print(
+        f"{name:>34}: {elapsed * 1e6 / iterations:9.1f} us/batch  "
+        f"{iterations * batch_size / elapsed:12,.0f} events/s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--profile", action="store_true", help="cetak profil cProfile per jalur")
+    parser.add_argument("--top", type=int, default=8)
+    args = parser.parse_args()
+
+    events = [generate_event() for _ in range(args.batch_size)]
+    wrapped = json.dumps(jsonable_encoder({"events": events})).encode("utf-8")
+    array = json.dumps(jsonable_encoder(events)).encode("utf-8")
+    paths = [
+        ("publish, double validation", publish_double_validation, wrapped),
+        ("publish, single validation", publish_single_validation, wrapped),
+        ("adapter validate_json", adapter_validate_json, array),
+        (f"publish/batch, {json_codec.JSON_BACKEND} + adapter", publish_batch, array),
+    ]
+    print(f"{args.batch_size} events/batch, {len(array) / 1024:.1f} KiB body, {args.iterations} iterations")
+
+    for name, decode, body in paths:
+        assert len(decode(body)) == args.batch_size
+        start = time.perf_counter()
+        for _ in range(args.iterations):
+            decode(body)
+        report(name, args.iterations, args.batch_size, time.perf_counter() - start)
+
+    if args.profile:
+        for name, decode, body in paths:
+            print(f"\n== {name} ==")
+            profiler = cProfile.Profile()
+            profiler.enable()
+            for _ in range(args.iterations):
+                decode(body)
+            profiler.disable()
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Ukur latency POST /publish (p50/p95/p99) terhadap aggregator yang sedang berjalan.
+
+Jalankan terhadap dua build (sebelum/sesudah perubahan) untuk membandingkan:
+    AGGREGATOR_URL=http://localhost:8080 python -m benchmarks.bench_publish_latency \\
+        --requests 2000 --batch-size 50 --concurrency 8
+
+Untuk mengukur scaling multi-process aggregator (AGGREGATOR_PROCESSES=1, 2, 4, ...)
+jalankan client dari beberapa proses supaya client tidak menjadi bottleneck:
+    python -m benchmarks.bench_publish_latency --requests 20000 --processes 4
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import statistics
+import time
+import uuid
+
+import aiohttp
+
+AGGREGATOR_URL = os.getenv("AGGREGATOR_URL", "http://localhost:8080")
+
+
+def make_batch(batch_size: int):
+    return [
+        {
+            "topic": f"bench.latency-{i % 8}",
+            "event_id": str(uuid.uuid4()),
+            "timestamp": "2025-12-18T10:30:00Z",
+            "source": "bench",
+            "payload": {"level": "INFO", "message": f"Log message {i}"},
+        }
+        for i in range(batch_size)
+    ]
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def worker(session: aiohttp.ClientSession, url: str, jobs: asyncio.Queue, latencies, batch_size: int):
+    while True:
+        try:
+            jobs.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+        body = {"events": make_batch(batch_size)}
+        start = time.perf_counter()
+        async with session.post(url, json=body) as resp:
+            await resp.read()
+            if resp.status == 200:
+                latencies.append((time.perf_counter() - start) * 1000)
+
+
+async def run_client(url: str, requests: int, batch_size: int, concurrency: int):
+    jobs = asyncio.Queue()
+    for i in range(requests):
+        jobs.put_nowait(i)
+
+    latencies = []
+    async with aiohttp.ClientSession() as session:
+        await asyncio.gather(*[
+            worker(session, url, jobs, latencies, batch_size)
+            for _ in range(concurrency)
+        ])
+    return latencies
+
+
+def run_client_process(args):
+    return asyncio.run(run_client(*args))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8, help="request paralel per proses client")
+    parser.add_argument("--processes", type=int, default=1, help="jumlah proses client")
+    parser.add_argument("--path", default="/publish")
+    args = parser.parse_args()
+
+    url = AGGREGATOR_URL + args.path
+    share = [args.requests // args.processes + (i < args.requests % args.processes) for i in range(args.processes)]
+    start = time.perf_counter()
+    if args.processes == 1:
+        latencies = asyncio.run(run_client(url, args.requests, args.batch_size, args.concurrency))
+    else:
+        with multiprocessing.get_context("spawn").Pool(args.processes) as pool:
+            results = pool.map(
+                run_client_process,
+                [(url, n, args.batch_size, args.concurrency) for n in share]
+            )
+        latencies = [latency for result in results for latency in result]
+    elapsed = time.perf_counter() - start
+
+    if not latencies:
+        print("No successful requests")
+        return
+
+    print(
+        f"{len(latencies)}/{args.requests} requests OK, batch_size={args.batch_size}, "
+        f"concurrency={args.concurrency}, processes={args.processes}"
+    )
+    print(f"  p50={percentile(latencies, 50):.2f}ms  p95={percentile(latencies, 95):.2f}ms  "
+          f"p99={percentile(latencies, 99):.2f}ms  mean={statistics.mean(latencies):.2f}ms")
+    print(f"  throughput={len(latencies) * args.batch_size / elapsed:.0f} events/s")
+
+
+if __name__ == "__main__":
+    main()
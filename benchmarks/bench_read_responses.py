@@ -0,0 +1,101 @@
+"""
+Latency GET /events untuk halaman besar (default 10k baris): jalur lama
+(response_model=List[EventResponse] -> validasi pydantic + jsonable_encoder +
+json.dumps) vs jalur sekarang (dict EventResponse di-serialize langsung
+dengan json_codec/orjson). Juga mengukur /stats (StatsResponse via
+FastAPI vs model_dump_json).
+
+Database tidak dipakai: get_events_page diganti halaman sintetis yang
+bentuknya sama dengan _event_row_to_dict, sehingga yang diukur hanya
+serialisasi + overhead FastAPI lewat ASGI in-process.
+    python -m benchmarks.bench_read_responses --rows 10000 --requests 50
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List
+
+import httpx
+from fastapi import FastAPI
+
+from src import main as aggregator
+from src.models import EventResponse, StatsResponse
+from publisher.main import generate_event
+
+
+def make_page(rows: int):
+    return [dict(generate_event(), processed_at="2025-12-18T10:30:00.123456") for _ in range(rows)]
+
+
+def baseline_app(page, stats: StatsResponse) -> FastAPI:
+    """Endpoint dengan perilaku lama: return dict / model dan biarkan response_model yang serialize"""
+    app = FastAPI()
+
+    @app.get("/events", response_model=List[EventResponse])
+    async def events():
+        return page
+
+    @app.get("/stats", response_model=StatsResponse)
+    async def stats_endpoint():
+        return stats
+
+    return app
+
+
+async def measure(name: str, app, path: str, requests: int):
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+        await client.get(path)
+        samples = []
+        size = 0
+        for _ in range(requests):
+            start = time.perf_counter()
+            resp = await client.get(path)
+            samples.append((time.perf_counter() - start) * 1000)
+            size = len(resp.content)
+    samples.sort()
+    print(
+        f"{name:>28}: p50 {statistics.median(samples):8.2f} ms  "
+        f"p95 {samples[int(len(samples) * 0.95) - 1]:8.2f} ms  {size / 1024:9.1f} KiB"
+    )
+
+
+async def run(rows: int, requests: int):
+    page = make_page(rows)
+
+    async def fake_events_page(*args, **kwargs):
+        return page, None
+
+    async def fake_db_stats():
+        return {"received": 1000, "unique_processed": 700, "duplicate_dropped": 300}, ["logs.a", "logs.b"]
+
+    aggregator.get_events_page = fake_events_page
+    aggregator.cached_db_stats = fake_db_stats
+    aggregator.EVENTS_MAX_PAGE_SIZE = rows
+    aggregator._startup_time = time.time()
+
+    stats = StatsResponse(
+        received=1000, unique_processed=700, duplicate_dropped=300, topics=["logs.a", "logs.b"],
+        uptime_seconds=1.0, unique_rate=70.0, duplicate_rate=30.0
+    )
+    baseline = baseline_app(page, stats)
+
+    print(f"GET /events, {rows} rows, {requests} requests")
+    await measure("response_model (lama)", baseline, "/events", requests)
+    await measure("json_response (sekarang)", aggregator.app, f"/events?limit={rows}", requests)
+    print(f"\nGET /stats, {requests * 20} requests")
+    await measure("response_model (lama)", baseline, "/stats", requests * 20)
+    await measure("json_response (sekarang)", aggregator.app, "/stats", requests * 20)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.requests))
+
+
+if __name__ == "__main__":
+    main()
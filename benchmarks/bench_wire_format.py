@@ -0,0 +1,70 @@
+"""
+JSON vs MessagePack untuk ingest event log kecil: byte di wire dan
+events/s per core (satu thread) di kedua sisi.
+
+- publisher: encode body {"events": [...]} (json.dumps seperti sebelumnya,
+  orjson, msgpack)
+- aggregator /publish: decode body + validasi PublishRequest
+- aggregator /events: encode halaman EventResponse (JSON vs msgpack)
+
+    python -m benchmarks.bench_wire_format --batch-size 50 --iterations 20000
+"""
+
+import argparse
+import json
+import time
+
+import msgpack
+import orjson
+
+from src.main import decode_body
+from src.models import PublishRequest
+from publisher.main import generate_event
+
+
+def measure(name: str, iterations: int, batch_size: int, fn, size: int = None):
+    fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = time.perf_counter() - start
+    size_info = f"  {size:8,d} bytes" if size is not None else ""
+    print(f"{name:>34}: {iterations * batch_size / elapsed:12,.0f} events/s{size_info}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    events = [generate_event() for _ in range(args.batch_size)]
+    body = {"events": events}
+    json_body = json.dumps(body).encode("utf-8")
+    msgpack_body = msgpack.packb(body, use_bin_type=True)
+    n, size = args.iterations, args.batch_size
+
+    print(f"{size} events/batch, {n} iterations")
+    print("\nwire size per batch")
+    print(f"{'json':>34}: {len(json_body):8,d} bytes")
+    print(f"{'msgpack':>34}: {len(msgpack_body):8,d} bytes ({len(msgpack_body) / len(json_body):.0%} dari JSON)")
+
+    print("\npublisher encode")
+    measure("json.dumps", n, size, lambda: json.dumps(body).encode("utf-8"), len(json_body))
+    measure("orjson.dumps", n, size, lambda: orjson.dumps(body))
+    measure("msgpack.packb", n, size, lambda: msgpack.packb(body, use_bin_type=True), len(msgpack_body))
+
+    print("\naggregator /publish decode + validasi")
+    measure("json (json_codec) + PublishRequest", n, size,
+            lambda: PublishRequest.model_validate(decode_body(json_body, "application/json")))
+    measure("msgpack + PublishRequest", n, size,
+            lambda: PublishRequest.model_validate(decode_body(msgpack_body, "application/msgpack")))
+
+    print("\naggregator /events encode")
+    page = [dict(event) for event in events]
+    measure("json.dumps", n, size, lambda: json.dumps(page).encode("utf-8"))
+    measure("msgpack.packb", n, size, lambda: msgpack.packb(page, use_bin_type=True))
+
+
+if __name__ == "__main__":
+    main()
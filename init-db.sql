@@ -6,8 +6,8 @@ CREATE TABLE IF NOT EXISTS processed_events (
     timestamp TEXT NOT NULL,
     source TEXT NOT NULL,
     payload JSONB NOT NULL,
-    received_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    received_at TIMESTAMP DEFAULT (now() AT TIME ZONE 'UTC'),
+    processed_at TIMESTAMP DEFAULT (now() AT TIME ZONE 'UTC'),
     UNIQUE (topic, event_id)
 );
 
@@ -16,7 +16,7 @@ CREATE TABLE IF NOT EXISTS dedup_store (
     id BIGSERIAL PRIMARY KEY,
     topic TEXT NOT NULL,
     event_id TEXT NOT NULL,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    created_at TIMESTAMP DEFAULT (now() AT TIME ZONE 'UTC'),
     UNIQUE (topic, event_id)
 );
 
@@ -26,6 +26,8 @@ CREATE TABLE IF NOT EXISTS event_stats (
     received INT DEFAULT 0,
     unique_processed INT DEFAULT 0,
     duplicate_dropped INT DEFAULT 0,
+    -- Naik setiap /admin/clear; semua proses mengosongkan cache in-process saat berubah
+    clear_generation BIGINT NOT NULL DEFAULT 0,
     CONSTRAINT single_row CHECK (id = 1)
 );
 
@@ -34,6 +36,34 @@ INSERT INTO event_stats (id, received, unique_processed, duplicate_dropped)
 VALUES (1, 0, 0, 0)
 ON CONFLICT (id) DO NOTHING;
 
+-- Sharded stats counters: writer concurrent meng-update shard berbeda,
+-- get_stats menjumlahkan event_stats + semua shard
+CREATE TABLE IF NOT EXISTS event_stats_shards (
+    shard INT PRIMARY KEY,
+    received BIGINT NOT NULL DEFAULT 0,
+    unique_processed BIGINT NOT NULL DEFAULT 0,
+    duplicate_dropped BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO event_stats_shards (shard)
+SELECT generate_series(0, 15)
+ON CONFLICT (shard) DO NOTHING;
+
+-- Event yang ditolak database (bukan error transient), body sebagai teks JSON
+CREATE TABLE IF NOT EXISTS dead_letter_events (
+    id BIGSERIAL PRIMARY KEY,
+    body TEXT NOT NULL,
+    error TEXT NOT NULL,
+    failed_at TIMESTAMP DEFAULT (now() AT TIME ZONE 'UTC')
+);
+
+-- Katalog topic, di-maintain saat insert; /stats membaca tabel ini
+-- (O(jumlah topic)) dan bukan SELECT DISTINCT atas processed_events
+CREATE TABLE IF NOT EXISTS topics (
+    topic TEXT PRIMARY KEY,
+    created_at TIMESTAMP DEFAULT (now() AT TIME ZONE 'UTC')
+);
+
 -- Create indexes for faster queries
 CREATE INDEX IF NOT EXISTS idx_processed_events_topic 
 ON processed_events(topic);
@@ -41,8 +71,16 @@ ON processed_events(topic);
 CREATE INDEX IF NOT EXISTS idx_processed_events_received_at 
 ON processed_events(received_at DESC);
 
-CREATE INDEX IF NOT EXISTS idx_dedup_store_topic_event_id 
-ON dedup_store(topic, event_id);
+-- Keyset pagination GET /events: ORDER BY (processed_at, id)
+CREATE INDEX IF NOT EXISTS idx_processed_events_processed_at_id
+ON processed_events(processed_at, id);
+
+CREATE INDEX IF NOT EXISTS idx_processed_events_topic_processed_at_id
+ON processed_events(topic, processed_at, id);
+
+-- Retention reaper: hapus key dedup yang melewati dedup window
+CREATE INDEX IF NOT EXISTS idx_dedup_store_created_at
+ON dedup_store(created_at);
 
 -- Grant permissions to aggregator user
 GRANT ALL PRIVILEGES ON DATABASE log_aggregator TO aggregator;
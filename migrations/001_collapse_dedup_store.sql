@@ -0,0 +1,33 @@
+-- Migrasi ke DEDUP_STORAGE=events: unique (topic, event_id) di processed_events
+-- menjadi satu-satunya authority dedup, dedup_store tidak ditulis lagi.
+--
+-- Jalankan setelah semua aggregator berhenti (atau sudah berjalan dengan
+-- DEDUP_STORAGE=events), lalu start ulang dengan DEDUP_STORAGE=events:
+--     psql "$DATABASE_URL" -f migrations/001_collapse_dedup_store.sql
+--
+-- Tidak bisa dipakai bersama EVENTS_PARTITION_INTERVAL: tabel partisi tidak
+-- bisa memiliki unique (topic, event_id) global.
+
+BEGIN;
+
+-- Key yang ada di dedup_store tapi tidak ada di processed_events (mis. event sudah
+-- dihapus retensi) tidak lagi menahan duplikat setelah migrasi. Laporkan jumlahnya.
+DO $$
+DECLARE
+    orphan_keys BIGINT;
+BEGIN
+    SELECT count(*) INTO orphan_keys
+    FROM dedup_store d
+    WHERE NOT EXISTS (
+        SELECT 1 FROM processed_events e
+        WHERE e.topic = d.topic AND e.event_id = d.event_id
+    );
+    RAISE NOTICE 'dedup_store keys without a processed_events row: %', orphan_keys;
+END $$;
+
+-- Index ini duplikat dari unique constraint (topic, event_id)
+DROP INDEX IF EXISTS idx_dedup_store_topic_event_id;
+
+TRUNCATE dedup_store;
+
+COMMIT;
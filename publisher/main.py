@@ -5,6 +5,7 @@ Mensimulasikan multiple sources dan mengirim duplikasi untuk test idempotency.
 
 import asyncio
 import aiohttp
+import json
 import logging
 import os
 import random
@@ -25,6 +26,18 @@ NUM_WORKERS = int(os.getenv("PUBLISHER_WORKERS", "3"))
 EVENT_COUNT = int(os.getenv("EVENT_COUNT", "50000"))
 DUPLICATE_RATE = float(os.getenv("DUPLICATE_RATE", "0.35"))  # 35% duplikasi
 
+# Retry saat aggregator menolak karena overload (429/503) atau timeout
+PUBLISH_MAX_RETRIES = int(os.getenv("PUBLISH_MAX_RETRIES", "6"))
+PUBLISH_BACKOFF_BASE_S = float(os.getenv("PUBLISH_BACKOFF_BASE_S", "0.2"))
+PUBLISH_BACKOFF_MAX_S = float(os.getenv("PUBLISH_BACKOFF_MAX_S", "10"))
+
+# Format body /publish: json | msgpack (butuh package msgpack)
+PUBLISH_FORMAT = os.getenv("PUBLISH_FORMAT", "json").lower()
+if PUBLISH_FORMAT == "msgpack":
+    import msgpack
+elif PUBLISH_FORMAT != "json":
+    raise ValueError(f"Unsupported PUBLISH_FORMAT: {PUBLISH_FORMAT} (expected json or msgpack)")
+
 # Topics dan sources untuk realistic simulation
 TOPICS = [
     "logs.authentication",
@@ -68,6 +81,26 @@ def generate_event(event_id: str = None) -> Dict[str, Any]:
     }
 
 
+def encode_body(events: List[Dict[str, Any]]) -> tuple[bytes, str]:
+    """Encode body /publish sesuai PUBLISH_FORMAT; return (body, content type)"""
+    if PUBLISH_FORMAT == "msgpack":
+        return msgpack.packb({"events": events}, use_bin_type=True), "application/msgpack"
+    return json.dumps({"events": events}).encode("utf-8"), "application/json"
+
+
+def backoff_delay(attempt: int, retry_after: str = None) -> float:
+    """
+    Exponential backoff dengan full jitter; Retry-After dari aggregator
+    menjadi batas bawah.
+    """
+    delay = random.uniform(0, min(PUBLISH_BACKOFF_MAX_S, PUBLISH_BACKOFF_BASE_S * 2 ** attempt))
+    try:
+        delay = max(delay, float(retry_after))
+    except (TypeError, ValueError):
+        pass
+    return delay
+
+
 async def publish_batch(
     session: aiohttp.ClientSession,
     events: List[Dict[str, Any]],
@@ -76,25 +109,57 @@ async def publish_batch(
     """
     Publish batch of events ke aggregator.
     Return (successful, failed)
+
+    429/503 dan timeout diulang dengan backoff. Pada partial acceptance
+    hanya event dengan error `retryable` yang dikirim ulang.
     """
-    try:
-        async with session.post(
-            f"{AGGREGATOR_URL}/publish",
-            json={"events": events},
-            timeout=aiohttp.ClientTimeout(total=30)
-        ) as resp:
-            result = await resp.json()
-            
-            if resp.status == 200:
-                accepted = result.get("accepted", 0)
-                logger.debug(f"Worker {worker_id}: Published batch, accepted={accepted}")
-                return accepted, len(events) - accepted
-            else:
-                logger.error(f"Worker {worker_id}: Publish failed with status {resp.status}")
-                return 0, len(events)
-    except Exception as e:
-        logger.error(f"Worker {worker_id}: Error publishing batch: {e}")
-        return 0, len(events)
+    pending = events
+    accepted_total = 0
+    
+    for attempt in range(PUBLISH_MAX_RETRIES + 1):
+        retry_after = None
+        body, content_type = encode_body(pending)
+        try:
+            async with session.post(
+                f"{AGGREGATOR_URL}/publish",
+                data=body,
+                headers={"Content-Type": content_type},
+                timeout=aiohttp.ClientTimeout(total=30)
+            ) as resp:
+                retry_after = resp.headers.get("Retry-After")
+                
+                if resp.status == 200:
+                    result = await resp.json()
+                    accepted_total += result.get("accepted", 0)
+                    retryable = [
+                        pending[error["index"]]
+                        for error in result.get("errors", [])
+                        if error.get("retryable") and "index" in error
+                    ]
+                    logger.debug(
+                        f"Worker {worker_id}: Published batch, accepted={result.get('accepted', 0)}, "
+                        f"retryable={len(retryable)}"
+                    )
+                    if not retryable:
+                        return accepted_total, len(events) - accepted_total
+                    pending = retryable
+                elif resp.status in (429, 503):
+                    logger.warning(
+                        f"Worker {worker_id}: Aggregator overloaded ({resp.status}), "
+                        f"retrying {len(pending)} events (attempt {attempt + 1}/{PUBLISH_MAX_RETRIES})"
+                    )
+                else:
+                    logger.error(f"Worker {worker_id}: Publish failed with status {resp.status}")
+                    return accepted_total, len(events) - accepted_total
+        except Exception as e:
+            # Timeout / koneksi putus: kirim ulang (dedup di aggregator menjaga idempotency)
+            logger.error(f"Worker {worker_id}: Error publishing batch: {e}")
+        
+        if attempt < PUBLISH_MAX_RETRIES:
+            await asyncio.sleep(backoff_delay(attempt, retry_after))
+    
+    logger.error(f"Worker {worker_id}: Giving up on {len(pending)} events after {PUBLISH_MAX_RETRIES} retries")
+    return accepted_total, len(events) - accepted_total
 
 
 async def publisher_worker(worker_id: int, events_per_worker: int):
@@ -149,6 +214,7 @@ async def run_publisher():
     logger.info(f"Total events to generate: {EVENT_COUNT}")
     logger.info(f"Duplicate rate: {DUPLICATE_RATE * 100:.1f}%")
     logger.info(f"Target aggregator: {AGGREGATOR_URL}")
+    logger.info(f"Publish format: {PUBLISH_FORMAT}")
     
     # Wait untuk aggregator ready
     logger.info("Waiting for aggregator to be ready...")
@@ -0,0 +1,148 @@
+"""
+Redis Streams sebagai broker ingest antara /publish dan consumer.
+
+/publish meng-XADD satu entry per event dalam satu pipeline per request.
+Consumer membaca lewat consumer group (XREADGROUP) per batch dan meng-XACK
+setelah commit ke database, sehingga beberapa replika aggregator berbagi
+beban dan entry yang belum di-ack tetap ada setelah restart. Entry milik
+consumer yang mati (idle lebih dari reclaim_idle_ms) diambil alih dengan
+XAUTOCLAIM. Entry yang sudah di-ack juga di-XDEL supaya stream hanya
+berisi event yang belum di-commit.
+"""
+
+import logging
+import time
+from typing import Any, Dict, List, Tuple
+
+from redis import asyncio as aioredis
+from redis.exceptions import ResponseError
+
+from src import json_codec
+from src.models import Event
+
+logger = logging.getLogger(__name__)
+
+_FIELD = b"event"
+
+
+class RedisStreamBroker:
+    """Producer/consumer Redis Streams dengan consumer group"""
+
+    def __init__(
+        self,
+        client: "aioredis.Redis",
+        stream: str,
+        group: str,
+        reclaim_idle_ms: int = 30000,
+        reclaim_interval_ms: int = 5000,
+    ):
+        self.client = client
+        self.stream = stream
+        self.group = group
+        self.reclaim_idle_ms = reclaim_idle_ms
+        self.reclaim_interval_ms = reclaim_interval_ms
+        self._claim_cursor: Dict[str, str] = {}
+        self._last_reclaim: Dict[str, float] = {}
+        self.published = 0
+        self.acked = 0
+        self.reclaimed = 0
+        self.dropped = 0
+
+    @classmethod
+    def from_url(cls, url: str, stream: str, group: str, **kwargs) -> "RedisStreamBroker":
+        return cls(aioredis.from_url(url), stream, group, **kwargs)
+
+    async def ensure_group(self):
+        """Buat stream dan consumer group jika belum ada"""
+        try:
+            await self.client.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def publish(self, events: List[Event]) -> List[bytes]:
+        """XADD semua event dalam satu pipeline (satu round trip per request)"""
+        if not events:
+            return []
+        async with self.client.pipeline(transaction=False) as pipe:
+            for event in events:
+                pipe.xadd(self.stream, {_FIELD: json_codec.dumps_bytes(event.dict())})
+            ids = await pipe.execute()
+        self.published += len(ids)
+        return ids
+
+    def _decode(self, entries, consumer: str) -> Tuple[List[Tuple[bytes, Event]], List[bytes]]:
+        decoded, poison = [], []
+        for entry_id, fields in entries:
+            try:
+                decoded.append((entry_id, Event(**json_codec.loads(fields[_FIELD]))))
+            except Exception as e:
+                logger.error(f"Dropping unreadable stream entry {entry_id!r} (consumer {consumer}): {e}")
+                poison.append(entry_id)
+        return decoded, poison
+
+    async def _reclaim(self, consumer: str, count: int):
+        """XAUTOCLAIM entry yang idle terlalu lama dari consumer lain (mis. replika mati)"""
+        now = time.monotonic()
+        if now - self._last_reclaim.get(consumer, 0) < self.reclaim_interval_ms / 1000:
+            return []
+        self._last_reclaim[consumer] = now
+
+        result = await self.client.xautoclaim(
+            self.stream, self.group, consumer,
+            min_idle_time=self.reclaim_idle_ms,
+            start_id=self._claim_cursor.get(consumer, "0-0"),
+            count=count,
+        )
+        next_cursor, entries = result[0], result[1]
+        self._claim_cursor[consumer] = next_cursor
+        # Entry yang sudah dihapus dari stream tidak punya field
+        entries = [(entry_id, fields) for entry_id, fields in entries if fields]
+        self.reclaimed += len(entries)
+        return entries
+
+    async def read(self, consumer: str, count: int, block_ms: int) -> List[Tuple[bytes, Event]]:
+        """Ambil sampai count event: entry stalled yang di-reclaim lebih dulu, lalu entry baru"""
+        entries = await self._reclaim(consumer, count)
+        if not entries:
+            response = await self.client.xreadgroup(
+                self.group, consumer, {self.stream: ">"}, count=count, block=block_ms
+            )
+            entries = response[0][1] if response else []
+
+        decoded, poison = self._decode(entries, consumer)
+        if poison:
+            self.dropped += len(poison)
+            await self.ack(poison)
+        return decoded
+
+    async def ack(self, entry_ids: List[bytes]):
+        """XACK + XDEL entry yang sudah di-commit"""
+        if not entry_ids:
+            return
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.xack(self.stream, self.group, *entry_ids)
+            pipe.xdel(self.stream, *entry_ids)
+            acked, _ = await pipe.execute()
+        self.acked += acked
+
+    async def length(self) -> int:
+        """Jumlah entry yang belum di-commit (dipakai untuk admission control)"""
+        return await self.client.xlen(self.stream)
+
+    async def stats(self) -> Dict[str, Any]:
+        length = await self.client.xlen(self.stream)
+        pending = await self.client.xpending(self.stream, self.group)
+        return {
+            "stream": self.stream,
+            "group": self.group,
+            "length": length,
+            "pending": pending["pending"],
+            "published": self.published,
+            "acked": self.acked,
+            "reclaimed": self.reclaimed,
+            "dropped": self.dropped,
+        }
+
+    async def close(self):
+        await self.client.aclose()
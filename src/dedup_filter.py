@@ -0,0 +1,141 @@
+"""
+Probabilistic dedup filter (Bloom filter) di depan dedup_store.
+
+Filter menjawab "pasti baru" atau "mungkin sudah pernah dilihat" untuk key
+(topic, event_id). Event yang pasti baru bisa melewati existence check ke
+database; event yang mungkin sudah dilihat tetap dicek ke database, sehingga
+false positive hanya menambah round trip, bukan salah dedup.
+"""
+
+import hashlib
+import math
+from typing import Any, Dict, Iterable, Tuple
+
+
+def _key_bytes(topic: str, event_id: str) -> bytes:
+    return topic.encode("utf-8") + b"\x00" + event_id.encode("utf-8")
+
+
+class BloomFilter:
+    """Bloom filter dengan double hashing di atas blake2b"""
+
+    def __init__(self, capacity: int, false_positive_rate: float):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        if not 0 < false_positive_rate < 1:
+            raise ValueError("false_positive_rate must be between 0 and 1")
+
+        self.capacity = capacity
+        self.false_positive_rate = false_positive_rate
+        # Ukuran optimal: m = -n ln p / (ln 2)^2, k = (m / n) ln 2
+        self.num_bits = max(8, int(math.ceil(-capacity * math.log(false_positive_rate) / (math.log(2) ** 2))))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    @classmethod
+    def from_memory_budget(cls, max_bytes: int, false_positive_rate: float) -> "BloomFilter":
+        """Buat filter dengan kapasitas maksimum yang muat di max_bytes"""
+        num_bits = max_bytes * 8
+        capacity = int(num_bits * (math.log(2) ** 2) / -math.log(false_positive_rate))
+        return cls(max(1, capacity), false_positive_rate)
+
+    def _positions(self, key: bytes):
+        digest = hashlib.blake2b(key, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, topic: str, event_id: str):
+        for pos in self._positions(_key_bytes(topic, event_id)):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def might_contain(self, topic: str, event_id: str) -> bool:
+        return all(
+            self._bits[pos >> 3] & (1 << (pos & 7))
+            for pos in self._positions(_key_bytes(topic, event_id))
+        )
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self._bits)
+
+    @property
+    def is_full(self) -> bool:
+        return self.count >= self.capacity
+
+
+class DedupFilter:
+    """
+    Dua generasi Bloom filter (current + previous) dengan total memori
+    max_bytes. Saat current penuh, filter di-rotasi: previous dibuang,
+    current menjadi previous. Key yang ikut terbuang hanya kehilangan
+    fast path (dianggap "pasti baru"); dedup tetap dijamin oleh unique
+    constraint di database.
+    """
+
+    def __init__(self, max_bytes: int, false_positive_rate: float):
+        self.max_bytes = max_bytes
+        self.false_positive_rate = false_positive_rate
+        self._current = self._new_generation()
+        self._previous = None
+        # Sebelum warm-up selesai semua key dianggap "mungkin sudah dilihat"
+        self.ready = False
+        self.hits = 0
+        self.misses = 0
+        self.rotations = 0
+
+    def _new_generation(self) -> BloomFilter:
+        return BloomFilter.from_memory_budget(max(1, self.max_bytes // 2), self.false_positive_rate)
+
+    def might_contain(self, topic: str, event_id: str) -> bool:
+        """True jika key mungkin sudah diproses (harus dicek ke database)"""
+        if not self.ready:
+            return True
+        seen = self._current.might_contain(topic, event_id) or (
+            self._previous is not None and self._previous.might_contain(topic, event_id)
+        )
+        if seen:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return seen
+
+    def add(self, topic: str, event_id: str):
+        """Catat key yang sudah di-commit ke database"""
+        if self._current.is_full:
+            self.rotate()
+        self._current.add(topic, event_id)
+
+    def add_many(self, keys: Iterable[Tuple[str, str]]):
+        for topic, event_id in keys:
+            self.add(topic, event_id)
+
+    def rotate(self):
+        self._previous = self._current
+        self._current = self._new_generation()
+        self.rotations += 1
+
+    def reset(self):
+        """Kosongkan filter untuk rebuild; filter tidak ready sampai warm-up selesai"""
+        self.ready = False
+        self._current = self._new_generation()
+        self._previous = None
+
+    def stats(self) -> Dict[str, Any]:
+        generations = [g for g in (self._current, self._previous) if g is not None]
+        lookups = self.hits + self.misses
+        return {
+            "enabled": True,
+            "ready": self.ready,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups * 100, 2) if lookups else 0.0,
+            "keys": sum(g.count for g in generations),
+            "capacity": self._current.capacity * 2,
+            "memory_bytes": sum(g.memory_bytes for g in generations),
+            "false_positive_rate": self.false_positive_rate,
+            "rotations": self.rotations,
+        }
@@ -0,0 +1,123 @@
+"""
+Encode/decode JSON di satu tempat: orjson jika terpasang, fallback ke json.
+
+register_json_codecs dipasang di hook init pool sehingga asyncpg langsung
+menerima dict untuk parameter JSON/JSONB dan mengembalikan dict untuk kolom
+JSON/JSONB, tanpa json.dumps di pemanggil atau json.loads di pembaca.
+"""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson opsional
+    orjson = None
+
+JSON_BACKEND = "orjson" if orjson is not None else "json"
+
+# Versi format binary JSONB di protokol PostgreSQL
+_JSONB_VERSION = b"\x01"
+
+# orjson diam-diam mengubah integer di luar 64-bit menjadi float (atau menolak
+# angka yang terlalu panjang sebagai "infinity"). Float di luar rentang ini
+# tidak bisa berasal dari integer 64-bit, jadi dokumennya di-parse ulang dengan json.
+_INT64_FLOAT_MIN = -(2.0 ** 63)
+_UINT64_FLOAT_MAX = 2.0 ** 64
+_ORJSON_OVERFLOW_MESSAGE = "number is infinity"
+
+
+def _out_of_int64_range(value: float) -> bool:
+    return value >= _UINT64_FLOAT_MAX or value <= _INT64_FLOAT_MIN
+
+
+def _has_overflowed_int(value: Any) -> bool:
+    """True jika hasil parse berisi float yang mungkin integer besar dari orjson"""
+    kind = type(value)
+    if kind is dict:
+        items = value.values()
+    elif kind is list:
+        items = value
+    else:
+        return kind is float and _out_of_int64_range(value)
+    for item in items:
+        kind = type(item)
+        if kind is dict or kind is list:
+            if _has_overflowed_int(item):
+                return True
+        elif kind is float and _out_of_int64_range(item):
+            return True
+    return False
+
+
+def _reject_constant(name: str):
+    raise ValueError(f"invalid JSON constant: {name}")
+
+
+def _parse_float(text: str) -> float:
+    value = float(text)
+    if value in (float("inf"), float("-inf")):
+        raise ValueError(f"number is infinity when parsed as double: {text[:32]}")
+    return value
+
+
+def _json_loads(data) -> Any:
+    # NaN/Infinity dan float yang overflow ditolak seperti orjson; integer tetap exact
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    return json.loads(data, parse_constant=_reject_constant, parse_float=_parse_float)
+
+
+def _json_dumps_bytes(value: Any) -> bytes:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+if orjson is not None:
+    def dumps_bytes(value: Any) -> bytes:
+        try:
+            return orjson.dumps(value)
+        except TypeError:
+            # orjson menolak integer di luar 64-bit; JSON dan jsonb tidak membatasi
+            # ukuran angka, jadi value ini di-encode ulang dengan json
+            return _json_dumps_bytes(value)
+
+    def loads(data) -> Any:
+        try:
+            value = orjson.loads(data)
+        except orjson.JSONDecodeError as e:
+            if _ORJSON_OVERFLOW_MESSAGE not in str(e):
+                raise
+            return _json_loads(data)
+        if _has_overflowed_int(value):
+            return _json_loads(data)
+        return value
+else:
+    dumps_bytes = _json_dumps_bytes
+
+    loads = _json_loads
+
+
+def dumps(value: Any) -> str:
+    return dumps_bytes(value).decode("utf-8")
+
+
+def _encode_jsonb(value: Any) -> bytes:
+    return _JSONB_VERSION + dumps_bytes(value)
+
+
+def _decode_jsonb(data: bytes) -> Any:
+    if data[:1] != _JSONB_VERSION:
+        raise ValueError(f"unsupported jsonb format version: {data[:1]!r}")
+    return loads(data[1:])
+
+
+async def register_json_codecs(conn):
+    """Pasang codec binary JSON/JSONB di connection (berlaku juga untuk array dan COPY)"""
+    await conn.set_type_codec(
+        "jsonb", schema="pg_catalog",
+        encoder=_encode_jsonb, decoder=_decode_jsonb, format="binary"
+    )
+    await conn.set_type_codec(
+        "json", schema="pg_catalog",
+        encoder=dumps_bytes, decoder=loads, format="binary"
+    )
@@ -1,19 +1,37 @@
-from fastapi import FastAPI, HTTPException, Query
-from fastapi.responses import JSONResponse
-from pydantic import ValidationError
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.requests import ClientDisconnect
+from pydantic import BaseModel, ValidationError
 import asyncio
+import base64
 import logging
+import os
+import random
+import shutil
+import socket
 import time
-from typing import List, Optional, Dict, Any
-from datetime import datetime
+import zlib
+from typing import List, Optional, Dict, Any, Tuple
+from datetime import datetime, timezone
 from contextlib import asynccontextmanager
 
-from src.models import Event, PublishRequest, PublishResponse, EventResponse, StatsResponse, HealthResponse
+from src.models import EVENT_LIST_ADAPTER, Event, PublishRequest, PublishResponse, EventResponse, StatsResponse, HealthResponse
 from src.database import (
     init_pool, close_pool, init_db, is_processed, mark_processed,
-    get_events_by_topic, get_stats, get_topics, get_event_count,
-    increment_stats
+    mark_processed_batch, get_events_page, get_events_page_json, stream_events, get_stats, get_topics,
+    get_event_count, iter_dedup_keys, add_pending_stats,
+    flush_pending_stats, maintain_partitions, reap_expired, get_retention_status,
+    get_statement_stats, check_retention_config, dead_letter_events, clear_all_data, get_clear_generation, COPY_THRESHOLD, is_data_error, is_transient_error, DUPLICATE_EVENT, EVENTS_PARTITION_INTERVAL, EVENT_RETENTION_HOURS, DEDUP_WINDOW_HOURS
 )
+from src.dedup_filter import DedupFilter
+from src.recent_cache import RecentKeyCache
+from src.spool import Spool
+from src.broker import RedisStreamBroker
+from src.ndjson import NDJSONDecoder
+from src.msgpack_codec import MSGPACK_MEDIA_TYPE
+from src import msgpack_codec
+from src import json_codec
 
 # Setup logging
 logging.basicConfig(
@@ -22,50 +40,608 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Consumer configuration
+CONSUMER_MODE = os.getenv("CONSUMER_MODE", "batch")  # batch | single
+CONSUMER_WORKERS = max(1, int(os.getenv("CONSUMER_WORKERS", "4")))
+CONSUMER_BATCH_SIZE = int(os.getenv("CONSUMER_BATCH_SIZE", "500"))
+CONSUMER_BATCH_LINGER_MS = int(os.getenv("CONSUMER_BATCH_LINGER_MS", "20"))
+# Commit yang gagal diulang dengan backoff = uniform(0, min(max, base * 2^attempt));
+# error non-transient setelah CONSUMER_COMMIT_RETRIES kali dipindah ke dead_letter_events
+CONSUMER_COMMIT_RETRIES = int(os.getenv("CONSUMER_COMMIT_RETRIES", "5"))
+CONSUMER_RETRY_BACKOFF_BASE_S = float(os.getenv("CONSUMER_RETRY_BACKOFF_BASE_S", "0.1"))
+CONSUMER_RETRY_BACKOFF_MAX_S = float(os.getenv("CONSUMER_RETRY_BACKOFF_MAX_S", "5"))
+QUEUE_MAXSIZE = int(os.getenv("QUEUE_MAXSIZE", "10000"))
+# Admission control /publish: event ditolak (429) jika sub-queue tujuannya di atas
+# high-water mark (fraksi dari kapasitas sub-queue), bukan menunggu queue.put
+QUEUE_HIGH_WATER_MARK = float(os.getenv("QUEUE_HIGH_WATER_MARK", "0.8"))
+PUBLISH_RETRY_AFTER_S = int(os.getenv("PUBLISH_RETRY_AFTER_S", "1"))
+STATS_FLUSH_INTERVAL_MS = int(os.getenv("STATS_FLUSH_INTERVAL_MS", "250"))
+PARTITION_MAINTENANCE_INTERVAL_S = int(os.getenv("PARTITION_MAINTENANCE_INTERVAL_S", "300"))
+RETENTION_INTERVAL_S = int(os.getenv("RETENTION_INTERVAL_S", "60"))
+
+# GET /events pagination
+EVENTS_DEFAULT_PAGE_SIZE = int(os.getenv("EVENTS_DEFAULT_PAGE_SIZE", "100"))
+EVENTS_MAX_PAGE_SIZE = int(os.getenv("EVENTS_MAX_PAGE_SIZE", "1000"))
+# Sumber JSON GET /events: python (Record -> dict -> orjson) | postgres (JSON dibangun di database)
+EVENTS_JSON_SOURCE = os.getenv("EVENTS_JSON_SOURCE", "python").lower()
+EVENTS_STREAM_CHUNK_SIZE = int(os.getenv("EVENTS_STREAM_CHUNK_SIZE", "1000"))
+EVENTS_STREAM_STALL_TIMEOUT_S = float(os.getenv("EVENTS_STREAM_STALL_TIMEOUT_S", "30"))
+
+# Dedup filter configuration. auto = aktif hanya jika filter memang dibaca
+# (consumer single); batch consumer dedup lewat ON CONFLICT tanpa is_processed
+DEDUP_FILTER_ENABLED = os.getenv("DEDUP_FILTER_ENABLED", "auto").lower()  # auto | true | false
+DEDUP_FILTER_FPR = float(os.getenv("DEDUP_FILTER_FPR", "0.01"))
+DEDUP_FILTER_MAX_BYTES = int(os.getenv("DEDUP_FILTER_MAX_BYTES", str(16 * 1024 * 1024)))
+
+# Recent keys cache configuration (0 = disabled)
+RECENT_KEYS_MAX_SIZE = int(os.getenv("RECENT_KEYS_MAX_SIZE", "100000"))
+RECENT_KEYS_TTL_SECONDS = float(os.getenv("RECENT_KEYS_TTL_SECONDS", "0"))
+
+# Durable spool untuk event yang sudah diterima tapi belum di-commit ("" = nonaktif)
+SPOOL_DIR = os.getenv("SPOOL_DIR", "")
+SPOOL_SEGMENT_BYTES = int(os.getenv("SPOOL_SEGMENT_BYTES", str(64 * 1024 * 1024)))
+SPOOL_GROUP_COMMIT_MS = float(os.getenv("SPOOL_GROUP_COMMIT_MS", "2"))
+SPOOL_CHECKPOINT_INTERVAL_MS = int(os.getenv("SPOOL_CHECKPOINT_INTERVAL_MS", "500"))
+
+# Multi-process (src.server): index proses, dan apakah proses ini yang init schema
+AGGREGATOR_PROCESS_INDEX = os.getenv("AGGREGATOR_PROCESS_INDEX")
+AGGREGATOR_PROCESSES = int(os.getenv("AGGREGATOR_PROCESSES", "1"))
+INIT_DB_ON_STARTUP = os.getenv("INIT_DB_ON_STARTUP", "true").lower() == "true"
+AGGREGATOR_STARTED_AT = os.getenv("AGGREGATOR_STARTED_AT")
+# Task singleton (partisi, retensi) hanya di proses 0
+_IS_PRIMARY_PROCESS = AGGREGATOR_PROCESS_INDEX in (None, "0")
+
+# Broker ingest: "memory" (asyncio.Queue per worker) | "redis" (Redis Streams consumer group)
+INGEST_BROKER = os.getenv("INGEST_BROKER", "memory").lower()
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+BROKER_STREAM = os.getenv("BROKER_STREAM", "events:ingest")
+BROKER_GROUP = os.getenv("BROKER_GROUP", "aggregator")
+BROKER_CONSUMER_NAME = os.getenv(
+    "BROKER_CONSUMER_NAME",
+    socket.gethostname() + (f"-p{AGGREGATOR_PROCESS_INDEX}" if AGGREGATOR_PROCESS_INDEX is not None else "")
+)
+BROKER_BLOCK_MS = int(os.getenv("BROKER_BLOCK_MS", "1000"))
+BROKER_RECLAIM_IDLE_MS = int(os.getenv("BROKER_RECLAIM_IDLE_MS", "30000"))
+BROKER_RECLAIM_INTERVAL_MS = int(os.getenv("BROKER_RECLAIM_INTERVAL_MS", "5000"))
+BROKER_MAX_LENGTH = int(os.getenv("BROKER_MAX_LENGTH", "100000"))  # high-water mark stream
+
+# POST /publish/stream (NDJSON): ukuran batch enqueue, batas per baris dan
+# lama menunggu queue sebelum event di-shed
+PUBLISH_STREAM_BATCH_SIZE = int(os.getenv("PUBLISH_STREAM_BATCH_SIZE", "500"))
+PUBLISH_STREAM_MAX_LINE_BYTES = int(os.getenv("PUBLISH_STREAM_MAX_LINE_BYTES", str(1024 * 1024)))
+PUBLISH_STREAM_ADMIT_TIMEOUT_S = float(os.getenv("PUBLISH_STREAM_ADMIT_TIMEOUT_S", "30"))
+PUBLISH_STREAM_MAX_ERRORS = int(os.getenv("PUBLISH_STREAM_MAX_ERRORS", "1000"))
+_STREAM_ADMIT_POLL_S = 0.05
+
+# TTL cache counter + daftar topic untuk /stats (0 = tanpa cache)
+STATS_CACHE_TTL_MS = int(os.getenv("STATS_CACHE_TTL_MS", "1000"))
+
+# Interval cek clear_generation: /admin/clear di proses/replika lain mengosongkan cache di sini
+CLEAR_POLL_INTERVAL_MS = int(os.getenv("CLEAR_POLL_INTERVAL_MS", "1000"))
+
+# Batas waktu menunggu queue kosong saat shutdown; sisanya di-replay dari spool
+SHUTDOWN_DRAIN_TIMEOUT_S = float(os.getenv("SHUTDOWN_DRAIN_TIMEOUT_S", "30"))
+
 # Global state
 _startup_time = None
-_consumer_task = None
-_queue: asyncio.Queue = None
+_consumer_tasks: List[asyncio.Task] = []
+_queues: List[asyncio.Queue] = []
+_reserved: List[int] = []  # slot sub-queue yang sudah di-admit tapi belum di-put
+_worker_stats: List[Dict[str, Any]] = []
+_dedup_filter: Optional[DedupFilter] = None
+_filter_warmup_task: Optional[asyncio.Task] = None
+_recent_keys: Optional[RecentKeyCache] = None
+_stats_flush_task: Optional[asyncio.Task] = None
+_background_tasks: List[asyncio.Task] = []
+_retention_runs: Dict[str, Any] = {"last_run_at": None, "last_deleted": {}, "total_deleted": {}}
+_spool: Optional[Spool] = None
+_broker: Optional[RedisStreamBroker] = None
+_stats_cache: Dict[str, Any] = {"value": None, "expires_at": 0.0}
+_clear_generation: Optional[int] = None
+_stats_cache_lock = asyncio.Lock()
+
+
+def partition_for(topic: str, partitions: int) -> int:
+    """
+    Hash partition topic ke worker. Memakai crc32 (bukan hash() bawaan yang
+    di-random per proses) supaya topic yang sama selalu ke worker yang sama,
+    sehingga urutan per-topic terjaga.
+    """
+    return zlib.crc32(topic.encode("utf-8")) % partitions
+
+
+async def enqueue_event(event: Event, lsn: Optional[int] = None):
+    """
+    Masukkan event ke sub-queue milik worker yang meng-handle topic-nya.
+    Item queue adalah (lsn, event); lsn None jika spool nonaktif.
+    """
+    await _queues[partition_for(event.topic, len(_queues))].put((lsn, event))
+
+
+async def enqueue_events(events: List[Event]):
+    """
+    Mode redis: XADD ke stream (pipeline). Mode memory: tulis ke spool
+    (jika aktif, menunggu fsync) lalu enqueue.
+    """
+    if _broker is not None:
+        await _broker.publish(events)
+        return
+    if _spool is not None:
+        lsns = await _spool.append([json_codec.dumps_bytes(event.dict()) for event in events])
+    else:
+        lsns = [None] * len(events)
+    for lsn, event in zip(lsns, events):
+        await enqueue_event(event, lsn)
+
+
+def _high_water_mark(queue: asyncio.Queue) -> int:
+    return max(1, int(queue.maxsize * QUEUE_HIGH_WATER_MARK))
+
+
+def admit_events(events: List[Event]) -> Tuple[List[int], List[int]]:
+    """
+    Admission control per event: return (index admitted, index shed).
+    Slot admitted di-reserve sampai release_admitted supaya request yang
+    sedang menunggu fsync spool tidak membuat queue melewati high-water mark,
+    sehingga queue.put tidak pernah menunggu di request path.
+    """
+    admitted, shed = [], []
+    for idx, event in enumerate(events):
+        partition = partition_for(event.topic, len(_queues))
+        queue = _queues[partition]
+        if queue.qsize() + _reserved[partition] < _high_water_mark(queue):
+            _reserved[partition] += 1
+            admitted.append(idx)
+        else:
+            shed.append(idx)
+    return admitted, shed
+
+
+def release_admitted(events: List[Event]):
+    for event in events:
+        _reserved[partition_for(event.topic, len(_queues))] -= 1
+
+
+def _ack_spool(lsns):
+    """Event sudah di-commit: majukan checkpoint spool"""
+    if _spool is not None:
+        _spool.ack(lsns)
+
+
+async def replay_spool(records):
+    """Enqueue ulang event dari spool yang belum di-checkpoint (crash / shutdown sebelumnya)"""
+    for lsn, body in records:
+        try:
+            event = Event(**json_codec.loads(body))
+        except Exception as e:
+            logger.error(f"Skipping unreadable spool record {lsn}: {e}")
+            _spool.ack([lsn])
+            continue
+        await enqueue_event(event, lsn)
+    if records:
+        logger.info(f"Replayed {len(records)} events from spool")
+
 
+def _spool_dir(index: Optional[str]) -> str:
+    """Spool per proses (src.server) di SPOOL_DIR/process-<index>, atau SPOOL_DIR langsung"""
+    if index is None:
+        return SPOOL_DIR
+    return os.path.join(SPOOL_DIR, f"process-{index}")
 
-async def consumer_worker():
+
+def orphaned_spool_dirs() -> List[str]:
+    """
+    Spool process-<i> tanpa proses pemilik (i >= jumlah proses sekarang, atau
+    semua process-* jika berjalan single-process), mis. setelah
+    AGGREGATOR_PROCESSES diturunkan.
+    """
+    active = AGGREGATOR_PROCESSES if AGGREGATOR_PROCESS_INDEX is not None else 0
+    orphans = []
+    for name in sorted(os.listdir(SPOOL_DIR)):
+        index = name[len("process-"):]
+        if name.startswith("process-") and index.isdigit() and int(index) >= active:
+            orphans.append(os.path.join(SPOOL_DIR, name))
+    return orphans
+
+
+async def adopt_orphaned_spools() -> List[Tuple[int, bytes]]:
+    """
+    Pindahkan record yang belum di-checkpoint dari spool yatim ke spool proses ini
+    (append + fsync dulu, baru direktori lama dihapus) dan return record baru untuk
+    di-replay. Crash di tengah jalan hanya membuat event di-replay dua kali; dedup
+    di database membuatnya idempotent.
+    """
+    adopted = []
+    for directory in orphaned_spool_dirs():
+        orphan = Spool(directory, SPOOL_SEGMENT_BYTES, group_commit_ms=0)
+        bodies = [body for _, body in orphan.open()]
+        await orphan.close()
+        lsns = await _spool.append(bodies)
+        adopted.extend(zip(lsns, bodies))
+        shutil.rmtree(directory)
+        logger.warning(f"Adopted {len(bodies)} events from orphaned spool {directory}")
+    return adopted
+
+
+async def cached_db_stats() -> Tuple[Dict[str, int], List[str]]:
+    """
+    Counter dan daftar topic dari database, di-cache STATS_CACHE_TTL_MS.
+    Saat cache expired hanya satu request yang query; request lain menunggu
+    hasil yang sama (single-flight) sehingga polling /stats tidak menumpuk query.
+    """
+    if STATS_CACHE_TTL_MS <= 0:
+        return await get_stats(), await get_topics()
+    if _stats_cache["value"] is not None and time.monotonic() < _stats_cache["expires_at"]:
+        return _stats_cache["value"]
+    async with _stats_cache_lock:
+        if _stats_cache["value"] is not None and time.monotonic() < _stats_cache["expires_at"]:
+            return _stats_cache["value"]
+        value = (await get_stats(), await get_topics())
+        _stats_cache["value"] = value
+        _stats_cache["expires_at"] = time.monotonic() + STATS_CACHE_TTL_MS / 1000
+        return value
+
+
+def invalidate_stats_cache():
+    _stats_cache["value"] = None
+
+
+def reset_local_caches():
+    """Database baru di-clear: kosongkan cache in-process yang berisi key/counter lama"""
+    invalidate_stats_cache()
+    if _dedup_filter is not None:
+        # Database kosong, filter kosong sudah akurat
+        _dedup_filter.reset()
+        _dedup_filter.ready = True
+    if _recent_keys is not None:
+        # Key di cache sudah tidak ada di database; tanpa reset event baru di-drop sebagai duplikat
+        _recent_keys.clear()
+
+
+def dedup_filter_consulted() -> bool:
+    """Filter hanya dibaca consumer single (pengganti is_processed); mode lain tidak perlu memuatnya"""
+    return CONSUMER_MODE == "single" and INGEST_BROKER != "redis"
+
+
+async def warm_dedup_filter():
+    """Isi ulang Bloom filter dari dedup_store; filter baru dipakai setelah selesai"""
+    _dedup_filter.reset()
+    start = time.time()
+    try:
+        async for keys in iter_dedup_keys():
+            _dedup_filter.add_many(keys)
+        _dedup_filter.ready = True
+        logger.info(
+            f"Dedup filter warmed: {_dedup_filter.stats()['keys']} keys in {time.time() - start:.2f}s"
+        )
+    except Exception as e:
+        logger.error(f"Failed to warm dedup filter, falling back to database checks: {e}")
+
+
+def _remember_committed(keys):
+    """Catat key yang sudah di-commit ke filter dan cache (hanya setelah commit)"""
+    keys = list(keys)
+    if _dedup_filter is not None:
+        _dedup_filter.add_many(keys)
+    if _recent_keys is not None:
+        _recent_keys.add_many(keys)
+
+
+def _is_recent_duplicate(event: Event) -> bool:
+    """True jika key baru saja di-commit (duplikat pasti, tanpa I/O database)"""
+    return _recent_keys is not None and _recent_keys.contains((event.topic, event.event_id))
+
+
+def _record_worker_batch(worker_id: int, processed: int, unique: int, duplicate: int):
+    stats = _worker_stats[worker_id]
+    stats["processed"] += processed
+    stats["unique_processed"] += unique
+    stats["duplicate_dropped"] += duplicate
+    stats["batches"] += 1
+
+
+async def process_event(worker_id: int, event: Event):
+    """Proses satu event (mode single); raise jika gagal disimpan"""
+    # Check apakah sudah diproses sebelumnya. Hot duplicate dijawab cache,
+    # key yang pasti baru menurut Bloom filter tidak perlu dicek ke database.
+    if _is_recent_duplicate(event):
+        already_processed = True
+    elif _dedup_filter is not None and not _dedup_filter.might_contain(event.topic, event.event_id):
+        already_processed = False
+    else:
+        already_processed = await is_processed(event.topic, event.event_id)
+    
+    if already_processed:
+        # Duplikat ditemukan
+        add_pending_stats(duplicate=1)
+        _record_worker_batch(worker_id, 1, 0, 1)
+        logger.info(f"✗ Duplicate dropped: {event.topic}/{event.event_id}")
+    else:
+        # Event baru, process dan simpan
+        success, error = await mark_processed(event)
+        if not success and error != DUPLICATE_EVENT:
+            # Gagal disimpan (bukan duplikat): jangan dicatat di cache/filter, commit_with_retry mengulang
+            raise RuntimeError(f"Failed to store {event.topic}/{event.event_id}: {error}")
+        # Key ada di database (baru di-commit atau konflik unique)
+        _remember_committed([(event.topic, event.event_id)])
+        if success:
+            add_pending_stats(unique=1)
+            _record_worker_batch(worker_id, 1, 1, 0)
+            logger.info(f"✓ Event processed: {event.topic}/{event.event_id}")
+        else:
+            # Race condition, event sudah diproses oleh worker lain
+            add_pending_stats(duplicate=1)
+            _record_worker_batch(worker_id, 1, 0, 1)
+            logger.warning(f"✗ Event rejected: {error} - {event.topic}/{event.event_id}")
+
+
+async def consumer_worker(worker_id: int, queue: asyncio.Queue):
     while True:
+        lsn, event = await queue.get()
         try:
-            event = await _queue.get()
-            logger.debug(f"Consumer processing event: {event.topic}/{event.event_id}")
-            
-            # Check apakah sudah diproses sebelumnya
-            already_processed = await is_processed(event.topic, event.event_id)
-            
-            if already_processed:
-                # Duplikat ditemukan
-                await increment_stats(duplicate=1)
-                logger.info(f"✗ Duplicate dropped: {event.topic}/{event.event_id}")
-            else:
-                # Event baru, process dan simpan
-                success, error = await mark_processed(event)
-                if success:
-                    await increment_stats(unique=1)
-                    logger.info(f"✓ Event processed: {event.topic}/{event.event_id}")
-                else:
-                    # Mungkin race condition, event sudah diproses oleh worker lain
-                    await increment_stats(duplicate=1)
-                    logger.warning(f"✗ Event rejected: {error} - {event.topic}/{event.event_id}")
-            
-            _queue.task_done()
+            logger.debug(f"Consumer {worker_id} processing event: {event.topic}/{event.event_id}")
+            await commit_with_retry(worker_id, [event], lambda batch: process_event(worker_id, batch[0]))
+            _ack_spool([lsn])
+        finally:
+            queue.task_done()
+
+
+async def drain_batch(queue: asyncio.Queue, max_size: int, linger_ms: int) -> List[Event]:
+    """
+    Ambil sampai max_size event dari queue. Menunggu event pertama tanpa batas,
+    lalu menunggu paling lama linger_ms untuk event berikutnya.
+    """
+    loop = asyncio.get_running_loop()
+    batch = [await queue.get()]
+    deadline = loop.time() + linger_ms / 1000
+    
+    while len(batch) < max_size:
+        try:
+            batch.append(queue.get_nowait())
+            continue
+        except asyncio.QueueEmpty:
+            pass
+        
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(await asyncio.wait_for(queue.get(), remaining))
+        except asyncio.TimeoutError:
+            break
+    
+    return batch
+
+
+async def commit_batch(worker_id: int, batch: List[Event]):
+    """Commit satu batch event; raise jika gagal sehingga caller tidak meng-ack"""
+    # Hot duplicate di-drop tanpa I/O database
+    fresh = [event for event in batch if not _is_recent_duplicate(event)]
+    cached_duplicates = len(batch) - len(fresh)
+    
+    # Satu transaksi per batch, unique/duplicate dari RETURNING
+    if fresh:
+        unique, duplicate = await mark_processed_batch(fresh, skipped_duplicates=cached_duplicates)
+    else:
+        add_pending_stats(duplicate=cached_duplicates)
+        unique, duplicate = 0, cached_duplicates
+    _remember_committed((event.topic, event.event_id) for event in fresh)
+    _record_worker_batch(worker_id, len(batch), unique, duplicate)
+    logger.info(
+        f"✓ Batch committed by worker {worker_id}: size={len(batch)}, "
+        f"unique={unique}, duplicate={duplicate}"
+    )
+
+
+async def _dead_letter(worker_id: int, events: List[Event], error: BaseException):
+    await dead_letter_events([(event, error) for event in events])
+    _worker_stats[worker_id]["dead_lettered"] += len(events)
+    _record_worker_batch(worker_id, len(events), 0, 0)
+    for event in events:
+        logger.error(f"Dead-lettered event {event.topic}/{event.event_id}: {error}")
+
+
+async def commit_with_retry(worker_id: int, events: List[Event], commit):
+    """
+    Jalankan commit(events) sampai berhasil supaya event bisa di-ack; tanpa ini
+    satu batch gagal menahan checkpoint spool (atau pending entry broker) selamanya.
+
+    - Database menolak batch karena data (mis. karakter yang ditolak jsonb): batch
+      dibelah dua secara rekursif; event penyebabnya dipindah ke dead_letter_events.
+      Setiap separuh punya retry sendiri, jadi separuh yang sudah di-commit tidak
+      pernah diulang (dan tidak terhitung ulang sebagai duplikat).
+    - Error transient (koneksi, restart server) diulang tanpa batas dengan backoff.
+    - Error lain diulang CONSUMER_COMMIT_RETRIES kali lalu di-dead-letter.
+    Jika dead-letter juga gagal, commit terus diulang.
+    """
+    attempt = 0
+    while True:
+        try:
+            await commit(events)
+            return
+        except Exception as e:
+            _worker_stats[worker_id]["errors"] += 1
+            data_error = is_data_error(e)
+            if data_error and len(events) > 1:
+                logger.warning(f"Worker {worker_id}: batch of {len(events)} rejected ({e}), splitting to isolate bad events")
+                middle = len(events) // 2
+                await commit_with_retry(worker_id, events[:middle], commit)
+                await commit_with_retry(worker_id, events[middle:], commit)
+                return
+            attempt += 1
+            if data_error or (attempt > CONSUMER_COMMIT_RETRIES and not is_transient_error(e)):
+                try:
+                    await _dead_letter(worker_id, events, e)
+                    return
+                except Exception as dead_letter_error:
+                    logger.error(f"Worker {worker_id}: dead-letter failed: {dead_letter_error}")
+            delay = random.uniform(0, min(CONSUMER_RETRY_BACKOFF_MAX_S, CONSUMER_RETRY_BACKOFF_BASE_S * 2 ** min(attempt, 16)))
+            logger.error(
+                f"Worker {worker_id}: commit of {len(events)} events failed "
+                f"(attempt {attempt}), retrying in {delay:.2f}s: {e}"
+            )
+            await asyncio.sleep(delay)
+
+
+async def commit_events(worker_id: int, events: List[Event]):
+    """Commit batch event lewat commit_batch dengan retry, isolasi dan dead-letter"""
+    await commit_with_retry(worker_id, events, lambda batch: commit_batch(worker_id, batch))
+
+
+async def batch_consumer_worker(worker_id: int, queue: asyncio.Queue):
+    while True:
+        items = await drain_batch(queue, CONSUMER_BATCH_SIZE, CONSUMER_BATCH_LINGER_MS)
+        events = [event for _, event in items]
+        try:
+            # Worker menahan batch sampai commit berhasil/di-dead-letter: urutan per topic
+            # tetap terjaga dan queue yang penuh menahan publisher lewat admission control
+            await commit_events(worker_id, events)
+            _ack_spool(lsn for lsn, _ in items)
+        finally:
+            for _ in items:
+                queue.task_done()
+
+
+async def stream_consumer_worker(worker_id: int):
+    """Consumer Redis Streams: XREADGROUP per batch, XACK setelah commit"""
+    consumer = f"{BROKER_CONSUMER_NAME}-{worker_id}"
+    while True:
+        try:
+            entries = await _broker.read(consumer, CONSUMER_BATCH_SIZE, BROKER_BLOCK_MS)
+        except Exception as e:
+            _worker_stats[worker_id]["errors"] += 1
+            logger.error(f"Error reading stream in worker {worker_id}: {e}")
+            await asyncio.sleep(1)
+            continue
+        if not entries:
+            continue
+        
+        events = [event for _, event in entries]
+        await commit_events(worker_id, events)
+        try:
+            await _broker.ack([entry_id for entry_id, _ in entries])
         except Exception as e:
-            logger.error(f"Error in consumer worker: {e}")
-            _queue.task_done()
+            # Tidak di-ack: entry tetap pending, diambil ulang lewat XAUTOCLAIM lalu di-dedup
+            _worker_stats[worker_id]["errors"] += 1
+            logger.error(f"Error acking stream entries in worker {worker_id}: {e}")
+
+
+async def stats_flusher():
+    """Flush counter stats in-process ke database secara periodik"""
+    while True:
+        await asyncio.sleep(STATS_FLUSH_INTERVAL_MS / 1000)
+        try:
+            await flush_pending_stats()
+        except Exception as e:
+            logger.error(f"Error flushing stats: {e}")
+
+
+async def partition_maintainer():
+    """Buat partisi ke depan dan drop partisi kedaluwarsa secara periodik"""
+    while True:
+        await asyncio.sleep(PARTITION_MAINTENANCE_INTERVAL_S)
+        try:
+            await maintain_partitions()
+        except Exception as e:
+            logger.error(f"Error maintaining partitions: {e}")
+
+
+async def retention_reaper():
+    """Hapus key dedup dan event yang kedaluwarsa secara periodik"""
+    while True:
+        await asyncio.sleep(RETENTION_INTERVAL_S)
+        try:
+            deleted = await reap_expired()
+            _retention_runs["last_run_at"] = datetime.utcnow().isoformat() + "Z"
+            _retention_runs["last_deleted"] = deleted
+            for table, count in deleted.items():
+                _retention_runs["total_deleted"][table] = _retention_runs["total_deleted"].get(table, 0) + count
+        except Exception as e:
+            logger.error(f"Error in retention reaper: {e}")
+
+
+async def clear_watcher():
+    """Reset cache in-process jika proses atau replika lain menjalankan /admin/clear"""
+    global _clear_generation
+    while True:
+        await asyncio.sleep(CLEAR_POLL_INTERVAL_MS / 1000)
+        try:
+            generation = await get_clear_generation()
+        except Exception as e:
+            logger.error(f"Error checking clear generation: {e}")
+            continue
+        if _clear_generation is not None and generation != _clear_generation:
+            reset_local_caches()
+            logger.info(f"Data cleared elsewhere (generation {generation}), local caches reset")
+        _clear_generation = generation
+
+
+async def spool_checkpointer():
+    """Persist checkpoint spool dan hapus segment yang sudah di-commit secara periodik"""
+    while True:
+        await asyncio.sleep(SPOOL_CHECKPOINT_INTERVAL_MS / 1000)
+        try:
+            await _spool.checkpoint()
+        except Exception as e:
+            logger.error(f"Error writing spool checkpoint: {e}")
+
+
+def get_worker_stats() -> List[Dict[str, Any]]:
+    """Snapshot throughput dan queue depth per worker"""
+    now = time.time()
+    snapshot = []
+    for worker_id, stats in enumerate(_worker_stats):
+        elapsed = now - stats["started_at"]
+        snapshot.append({
+            "worker_id": worker_id,
+            "queue_depth": _queues[worker_id].qsize(),
+            "processed": stats["processed"],
+            "unique_processed": stats["unique_processed"],
+            "duplicate_dropped": stats["duplicate_dropped"],
+            "batches": stats["batches"],
+            "errors": stats["errors"],
+            "dead_lettered": stats["dead_lettered"],
+            "events_per_second": round(stats["processed"] / elapsed, 2) if elapsed > 0 else 0.0,
+        })
+    return snapshot
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global _startup_time, _consumer_task, _queue
+    global _startup_time, _consumer_tasks, _queues, _reserved, _worker_stats, _dedup_filter, _filter_warmup_task, _recent_keys
+    global _stats_flush_task, _background_tasks, _spool, _broker, _clear_generation
     
     # Startup
-    logger.info("Starting aggregator service...")
-    _startup_time = time.time()
-    _queue = asyncio.Queue(maxsize=10000)
+    logger.info(f"Starting aggregator service (process={AGGREGATOR_PROCESS_INDEX or 0}, pid={os.getpid()})...")
+    process_started = time.time()
+    # Uptime dihitung sejak launcher start jika berjalan di bawah src.server
+    _startup_time = float(AGGREGATOR_STARTED_AT) if AGGREGATOR_STARTED_AT else process_started
+    # Kapasitas total tetap QUEUE_MAXSIZE, dibagi rata ke sub-queue per worker
+    _queues = [
+        asyncio.Queue(maxsize=max(1, QUEUE_MAXSIZE // CONSUMER_WORKERS))
+        for _ in range(CONSUMER_WORKERS)
+    ]
+    _reserved = [0] * CONSUMER_WORKERS
+    _worker_stats = [
+        {
+            "processed": 0,
+            "unique_processed": 0,
+            "duplicate_dropped": 0,
+            "batches": 0,
+            "errors": 0,
+            "dead_lettered": 0,
+            "started_at": process_started,
+        }
+        for _ in range(CONSUMER_WORKERS)
+    ]
+    
+    # Juga dicek di proses worker yang tidak menjalankan init_db
+    check_retention_config()
+    if CONSUMER_MODE == "batch" and COPY_THRESHOLD > CONSUMER_BATCH_SIZE:
+        logger.warning(
+            f"DB_COPY_THRESHOLD={COPY_THRESHOLD} > CONSUMER_BATCH_SIZE={CONSUMER_BATCH_SIZE}: "
+            "consumer batches never use the COPY path"
+        )
     
     try:
         # Initialize database pool dengan retry logic
@@ -75,7 +651,8 @@ async def lifespan(app: FastAPI):
         while retry_count < max_retries:
             try:
                 await init_pool()
-                await init_db()
+                if INIT_DB_ON_STARTUP:
+                    await init_db()
                 logger.info("Database initialized successfully")
                 break
             except Exception as e:
@@ -86,26 +663,127 @@ async def lifespan(app: FastAPI):
                 logger.warning(f"Database connection failed (attempt {retry_count}/{max_retries}): {e}")
                 await asyncio.sleep(2)
         
-        # Start consumer worker
-        _consumer_task = asyncio.create_task(consumer_worker())
-        logger.info("Consumer worker started")
+        # Warm Bloom filter dari dedup_store di background; sampai selesai
+        # semua event tetap dicek ke database
+        if DEDUP_FILTER_ENABLED != "false" and dedup_filter_consulted():
+            _dedup_filter = DedupFilter(DEDUP_FILTER_MAX_BYTES, DEDUP_FILTER_FPR)
+            _filter_warmup_task = asyncio.create_task(warm_dedup_filter())
+        elif DEDUP_FILTER_ENABLED == "true":
+            logger.warning(
+                "DEDUP_FILTER_ENABLED=true ignored: the filter is only consulted by "
+                "CONSUMER_MODE=single with INGEST_BROKER=memory"
+            )
+        
+        _stats_flush_task = asyncio.create_task(stats_flusher())
+        try:
+            _clear_generation = await get_clear_generation()
+        except Exception as e:
+            logger.warning(f"Could not read clear generation: {e}")
+        _background_tasks.append(asyncio.create_task(clear_watcher()))
+        if EVENTS_PARTITION_INTERVAL and _IS_PRIMARY_PROCESS:
+            _background_tasks.append(asyncio.create_task(partition_maintainer()))
+        if _IS_PRIMARY_PROCESS and (
+            DEDUP_WINDOW_HOURS > 0 or (EVENT_RETENTION_HOURS > 0 and not EVENTS_PARTITION_INTERVAL)
+        ):
+            _background_tasks.append(asyncio.create_task(retention_reaper()))
+        
+        if RECENT_KEYS_MAX_SIZE > 0:
+            _recent_keys = RecentKeyCache(RECENT_KEYS_MAX_SIZE, RECENT_KEYS_TTL_SECONDS)
+        
+        spool_records = []
+        if INGEST_BROKER == "redis":
+            # Redis (AOF) yang menyimpan event belum di-commit; spool lokal tidak dipakai
+            _broker = RedisStreamBroker.from_url(
+                REDIS_URL, BROKER_STREAM, BROKER_GROUP,
+                reclaim_idle_ms=BROKER_RECLAIM_IDLE_MS,
+                reclaim_interval_ms=BROKER_RECLAIM_INTERVAL_MS,
+            )
+            await _broker.ensure_group()
+            if SPOOL_DIR:
+                logger.warning("SPOOL_DIR is ignored with INGEST_BROKER=redis")
+        elif SPOOL_DIR:
+            # Spool per proses: replay oleh proses yang sama (index stabil); spool
+            # proses yang sudah tidak ada (jumlah proses diturunkan) diambil alih proses 0
+            _spool = Spool(_spool_dir(AGGREGATOR_PROCESS_INDEX), SPOOL_SEGMENT_BYTES, SPOOL_GROUP_COMMIT_MS)
+            spool_records = _spool.open()
+            if _IS_PRIMARY_PROCESS:
+                spool_records += await adopt_orphaned_spools()
+            _background_tasks.append(asyncio.create_task(spool_checkpointer()))
+        
+        # Start consumer workers, satu per sub-queue (atau per consumer stream)
+        if _broker is not None:
+            _consumer_tasks = [
+                asyncio.create_task(stream_consumer_worker(worker_id))
+                for worker_id in range(CONSUMER_WORKERS)
+            ]
+        else:
+            worker = consumer_worker if CONSUMER_MODE == "single" else batch_consumer_worker
+            _consumer_tasks = [
+                asyncio.create_task(worker(worker_id, queue))
+                for worker_id, queue in enumerate(_queues)
+            ]
+        logger.info(
+            f"{CONSUMER_WORKERS} consumer workers started (broker={INGEST_BROKER}, mode={CONSUMER_MODE}, "
+            f"batch_size={CONSUMER_BATCH_SIZE}, linger_ms={CONSUMER_BATCH_LINGER_MS})"
+        )
+        
+        # Replay sebelum menerima request supaya event lama tetap di depan event baru
+        await replay_spool(spool_records)
         
         yield
     finally:
         # Shutdown
         logger.info("Shutting down aggregator service...")
         
-        # Cancel consumer task
-        if _consumer_task:
-            _consumer_task.cancel()
+        if _filter_warmup_task:
+            _filter_warmup_task.cancel()
+        for task in _background_tasks:
+            task.cancel()
+        
+        # Drain queue selagi worker masih berjalan, baru cancel worker
+        # (cancel lebih dulu membuat join() menunggu selamanya). Mode redis tidak
+        # perlu drain: entry yang belum di-ack tetap pending di stream.
+        if _consumer_tasks and _broker is None:
             try:
-                await _consumer_task
+                await asyncio.wait_for(
+                    asyncio.gather(*(queue.join() for queue in _queues)),
+                    SHUTDOWN_DRAIN_TIMEOUT_S
+                )
+                logger.info("Queue emptied")
+            except asyncio.TimeoutError:
+                remaining = sum(queue.qsize() for queue in _queues)
+                if _spool is not None:
+                    logger.warning(f"Shutdown drain timed out, {remaining} events left in spool for replay")
+                else:
+                    logger.error(f"Shutdown drain timed out, dropping {remaining} queued events")
+        
+        for task in _consumer_tasks:
+            task.cancel()
+        for task in _consumer_tasks:
+            try:
+                await task
             except asyncio.CancelledError:
                 pass
         
-        # Wait untuk queue kosong
-        await _queue.join()
-        logger.info("Queue emptied")
+        if _spool is not None:
+            try:
+                await _spool.close()
+            except Exception as e:
+                logger.error(f"Error closing spool: {e}")
+        if _broker is not None:
+            await _broker.close()
+        
+        # Flush counter stats yang tersisa
+        if _stats_flush_task:
+            _stats_flush_task.cancel()
+            try:
+                await _stats_flush_task
+            except asyncio.CancelledError:
+                pass
+            try:
+                await flush_pending_stats()
+            except Exception as e:
+                logger.error(f"Error flushing stats on shutdown: {e}")
         
         # Close database pool
         await close_pool()
@@ -131,79 +809,511 @@ async def health_check():
     )
 
 
-@app.post("/publish", response_model=PublishResponse, tags=["Publishing"])
-async def publish_events(request: PublishRequest):
-    events_to_publish = request.get_events()
-    accepted = 0
-    rejected = 0
-    errors = []
+def json_response(content: Any, status_code: int = 200, headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    Response JSON yang sudah di-serialize: model pydantic lewat model_dump_json,
+    data lain lewat json_codec (orjson). Endpoint yang mengembalikan Response
+    melewati validasi ulang response_model + jsonable_encoder FastAPI,
+    sedangkan response_model di decorator tetap mendokumentasikan schema OpenAPI.
+    """
+    body = content.model_dump_json() if isinstance(content, BaseModel) else json_codec.dumps_bytes(content)
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
+
+
+def _overloaded_response(status_code: int, body: PublishResponse) -> JSONResponse:
+    return JSONResponse(
+        status_code=status_code,
+        content=body.dict(),
+        headers={"Retry-After": str(PUBLISH_RETRY_AFTER_S)}
+    )
+
+
+_PUBLISH_RESPONSES = {
+    429: {"model": PublishResponse, "description": "Queue di atas high-water mark; ulangi setelah Retry-After"},
+    503: {"model": PublishResponse, "description": "Ingest belum siap / storage tidak tersedia"},
+}
+
+
+async def ingest_events(
+    validated: List[Tuple[int, Event]],
+    count: int,
+    errors: List[Dict[str, Any]],
+    response: Response
+):
+    """
+    Admission control + enqueue event yang sudah tervalidasi, dipakai semua
+    endpoint ingest. validated berisi (index di request, event); errors
+    berisi error validasi yang sudah ditemukan pemanggil.
+    """
+    rejected = len(errors)
+    events = [event for _, event in validated]
+    if _broker is not None:
+        # Stream terlalu panjang: consumer tertinggal, tolak seluruh request
+        overloaded = await _broker.length() >= BROKER_MAX_LENGTH
+        admitted_idx, shed_idx = ([], list(range(len(events)))) if overloaded else (list(range(len(events))), [])
+    elif not _queues:
+        return _overloaded_response(503, PublishResponse(
+            status="unavailable", count=count, accepted=0, rejected=count, errors=errors
+        ))
+    else:
+        admitted_idx, shed_idx = admit_events(events)
+    
+    for i in shed_idx:
+        idx, event = validated[i]
+        errors.append({
+            "index": idx,
+            "event_id": event.event_id,
+            "error": "queue full",
+            "retryable": True
+        })
+    rejected += len(shed_idx)
+    if shed_idx:
+        logger.warning(f"Load shedding: {len(shed_idx)} events rejected (queue above high-water mark)")
+    
+    admitted = [events[i] for i in admitted_idx]
+    if admitted:
+        # Tulis ke spool (group-commit fsync) / stream sebelum menjawab, lalu put ke
+        # sub-queue worker (partisi per topic) untuk diproses async
+        try:
+            await enqueue_events(admitted)
+        except Exception as e:
+            logger.error(f"Failed to enqueue events: {e}")
+            return _overloaded_response(503, PublishResponse(
+                status="unavailable", count=count, accepted=0, rejected=count,
+                errors=errors + [{"error": str(e), "retryable": True}]
+            ))
+        finally:
+            if _broker is None:
+                release_admitted(admitted)
+    
+    # Received count dicatat sekali per request, di-flush oleh stats_flusher
+    # (tidak ada transaksi database di request path)
+    add_pending_stats(received=len(admitted))
+    return _publish_response(count, len(admitted), rejected, errors, bool(shed_idx), response)
+
+
+def _publish_response(
+    count: int,
+    accepted: int,
+    rejected: int,
+    errors: List[Dict[str, Any]],
+    shed: bool,
+    response: Response
+):
+    """Status accepted / partial (200 + Retry-After) / rejected (429) dari hasil ingest"""
+    body = PublishResponse(
+        status="partial" if shed and accepted else "accepted",
+        count=count,
+        accepted=accepted,
+        rejected=rejected,
+        errors=errors
+    )
+    if shed and not accepted:
+        body.status = "rejected"
+        return _overloaded_response(429, body)
+    if shed:
+        response.headers["Retry-After"] = str(PUBLISH_RETRY_AFTER_S)
+    return body
+
+
+def _request_body_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """requestBody OpenAPI untuk endpoint yang membaca body sendiri: JSON dan msgpack dengan schema sama"""
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": schema},
+                MSGPACK_MEDIA_TYPE: {"schema": schema},
+            },
+        }
+    }
+
+
+def decode_body(body: bytes, content_type: Optional[str]) -> Any:
+    """
+    Decode body JSON (json_codec) atau msgpack sesuai Content-Type.
+    ValueError jika body invalid, RuntimeError jika msgpack tidak terpasang.
+    """
+    if msgpack_codec.is_msgpack(content_type):
+        return msgpack_codec.unpackb(body)
+    return json_codec.loads(body)
+
+
+async def _publish(publish_request: PublishRequest, response: Response):
+    events_to_publish = publish_request.get_events()
+    try:
+        return await ingest_events(list(enumerate(events_to_publish)), len(events_to_publish), [], response)
+    except Exception as e:
+        logger.error(f"Error in publish endpoint: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post(
+    "/publish",
+    response_model=PublishResponse,
+    tags=["Publishing"],
+    responses={
+        **_PUBLISH_RESPONSES,
+        415: {"description": "Body msgpack tanpa dukungan msgpack di server"},
+        # Body dibaca sendiri (JSON/msgpack), validasi PublishRequest tetap 422 seperti sebelumnya
+        422: {
+            "description": "Validation Error",
+            "content": {"application/json": {"schema": {"$ref": "#/components/schemas/HTTPValidationError"}}},
+        },
+    },
+    openapi_extra=_request_body_schema({"$ref": "#/components/schemas/PublishRequest"}),
+)
+async def publish_events(request: Request, response: Response):
+    """
+    Terima event untuk diproses async. Body JSON atau msgpack
+    (Content-Type: application/msgpack) dengan schema PublishRequest yang sama.
+    Event yang sub-queue tujuannya di atas high-water mark tidak di-enqueue:
+    dilaporkan per event di `errors` dengan `retryable: true`. Jika sebagian
+    diterima status `partial` (200), jika tidak ada yang diterima 429.
+    Keduanya membawa header Retry-After.
+    """
+    try:
+        data = decode_body(await request.body(), request.headers.get("content-type"))
+    except RuntimeError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except ValueError as e:
+        # Format error sama dengan validasi body bawaan FastAPI
+        raise RequestValidationError([{
+            "type": "json_invalid", "loc": ("body", 0), "msg": "JSON decode error",
+            "input": {}, "ctx": {"error": str(e)}
+        }])
+    try:
+        publish_request = PublishRequest.model_validate(data)
+    except ValidationError as e:
+        raise RequestValidationError([{**error, "loc": ("body", *error["loc"])} for error in e.errors()])
+    return await _publish(publish_request, response)
+
+
+def decode_event_batch(body: bytes, content_type: Optional[str] = None) -> Tuple[List[Tuple[int, Event]], List[Dict[str, Any]]]:
+    """
+    Parse body array of events (JSON lewat json_codec/orjson, atau msgpack)
+    lalu validasi seluruh batch dalam satu panggilan EVENT_LIST_ADAPTER. Jika
+    ada event invalid, batch divalidasi ulang per event supaya event valid
+    tetap diterima dan error dilaporkan per index. ValueError jika body bukan
+    array, RuntimeError jika msgpack tidak terpasang.
+    """
+    items = decode_body(body, content_type)
+    if not isinstance(items, list):
+        raise ValueError("Request body must be a JSON array of events")
+    try:
+        return list(enumerate(EVENT_LIST_ADAPTER.validate_python(items))), []
+    except ValidationError:
+        pass
+    
+    validated, errors = [], []
+    for idx, item in enumerate(items):
+        try:
+            validated.append((idx, Event.model_validate(item)))
+        except ValidationError as e:
+            errors.append({
+                "index": idx,
+                "event_id": item.get("event_id", "unknown") if isinstance(item, dict) else "unknown",
+                "error": str(e),
+                "retryable": False
+            })
+    logger.warning(f"Event validation failed for {len(errors)} of {len(items)} events")
+    return validated, errors
+
+
+@app.post(
+    "/publish/batch",
+    response_model=PublishResponse,
+    tags=["Publishing"],
+    responses={
+        **_PUBLISH_RESPONSES,
+        400: {"description": "Body bukan array of events"},
+        415: {"description": "Body msgpack tanpa dukungan msgpack di server"},
+    },
+    openapi_extra=_request_body_schema({"type": "array", "items": {"$ref": "#/components/schemas/Event"}}),
+)
+async def publish_events_batch(request: Request, response: Response):
+    """
+    Endpoint ingest high-throughput: body berupa array of events (JSON atau
+    msgpack) yang di-parse dengan orjson/msgpack dan divalidasi sebagai satu
+    List[Event], tanpa json.loads + validasi PublishRequest di layer FastAPI.
+    Semantik admission control dan response sama dengan /publish.
+    """
+    try:
+        validated, errors = decode_event_batch(await request.body(), request.headers.get("content-type"))
+    except RuntimeError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     try:
-        for idx, event in enumerate(events_to_publish):
+        return await ingest_events(validated, len(validated) + len(errors), errors, response)
+    except Exception as e:
+        logger.error(f"Error in publish batch endpoint: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+async def _ingest_stream_batch(pending: List[Tuple[int, Event]], errors: List[Dict[str, Any]]) -> Tuple[int, int, bool]:
+    """
+    Enqueue satu batch dari /publish/stream. Berbeda dengan /publish, event
+    yang tidak muat ditunggu (body tidak dibaca lebih lanjut, sehingga TCP
+    menahan pengirim) sampai PUBLISH_STREAM_ADMIT_TIMEOUT_S, baru di-shed.
+    Return (accepted, shed, gagal enqueue).
+    """
+    deadline = time.monotonic() + PUBLISH_STREAM_ADMIT_TIMEOUT_S
+    accepted = 0
+    while pending:
+        events = [event for _, event in pending]
+        if _broker is not None:
+            overloaded = await _broker.length() >= BROKER_MAX_LENGTH
+            admitted_idx, shed_idx = ([], list(range(len(events)))) if overloaded else (list(range(len(events))), [])
+        else:
+            admitted_idx, shed_idx = admit_events(events)
+        
+        admitted = [events[i] for i in admitted_idx]
+        if admitted:
             try:
-                # Validasi event schema
-                validated_event = Event(**event.dict())
-                
-                # Increment received count
-                await increment_stats(received=1)
-                
-                # Put ke queue untuk diproses async
-                await _queue.put(validated_event)
-                accepted += 1
-                logger.debug(f"Event accepted for processing: {event.topic}/{event.event_id}")
-                
-            except ValidationError as e:
-                rejected += 1
-                error_detail = {
-                    "index": idx,
-                    "event_id": event.get("event_id", "unknown"),
-                    "error": str(e)
-                }
-                errors.append(error_detail)
-                logger.warning(f"Event validation failed: {error_detail}")
+                await enqueue_events(admitted)
             except Exception as e:
-                rejected += 1
-                error_detail = {
-                    "index": idx,
-                    "error": str(e)
-                }
-                errors.append(error_detail)
-                logger.error(f"Unexpected error processing event: {error_detail}")
+                logger.error(f"Failed to enqueue streamed events: {e}")
+                for idx, event in pending:
+                    _add_stream_error(errors, {"index": idx, "event_id": event.event_id, "error": str(e), "retryable": True})
+                add_pending_stats(received=accepted)
+                return accepted, len(pending), True
+            finally:
+                if _broker is None:
+                    release_admitted(admitted)
+            accepted += len(admitted)
         
-        return PublishResponse(
-            status="accepted",
-            count=len(events_to_publish),
-            accepted=accepted,
-            rejected=rejected,
-            errors=errors
-        )
+        pending = [pending[i] for i in shed_idx]
+        if pending and time.monotonic() >= deadline:
+            for idx, event in pending:
+                _add_stream_error(errors, {"index": idx, "event_id": event.event_id, "error": "queue full", "retryable": True})
+            logger.warning(f"Load shedding: {len(pending)} streamed events rejected after admission timeout")
+            break
+        if pending:
+            await asyncio.sleep(_STREAM_ADMIT_POLL_S)
+    
+    add_pending_stats(received=accepted)
+    return accepted, len(pending), False
+
+
+def _add_stream_error(errors: List[Dict[str, Any]], error: Dict[str, Any]):
+    # Daftar error dibatasi supaya memori tetap terbatas untuk stream besar; rejected tetap dihitung penuh
+    if len(errors) < PUBLISH_STREAM_MAX_ERRORS:
+        errors.append(error)
+
+
+@app.post(
+    "/publish/stream",
+    response_model=PublishResponse,
+    tags=["Publishing"],
+    responses={
+        **_PUBLISH_RESPONSES,
+        400: {"model": PublishResponse, "description": "Body terkompresi korup atau terpotong; event sebelum titik itu sudah di-enqueue"},
+        415: {"description": "Content-Encoding tidak didukung"},
+    },
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/x-ndjson": {
+                    "schema": {"type": "string", "description": "Satu JSON Event per baris; gzip/zstd via Content-Encoding"}
+                }
+            },
+        }
+    },
+)
+async def publish_events_stream(request: Request, response: Response):
+    """
+    Ingest NDJSON streaming: satu event per baris, body boleh gzip/zstd
+    (Content-Encoding). Baris di-parse begitu chunk tiba dan di-enqueue per
+    PUBLISH_STREAM_BATCH_SIZE event, jadi memori terbatas berapapun ukuran
+    body. `index` pada errors adalah nomor baris (0-based).
+    """
+    try:
+        decoder = NDJSONDecoder(request.headers.get("content-encoding"), PUBLISH_STREAM_MAX_LINE_BYTES)
+    except ValueError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    if _broker is None and not _queues:
+        return _overloaded_response(503, PublishResponse(status="unavailable", count=0, accepted=0, rejected=0))
+    
+    count = accepted = rejected = shed = 0
+    errors: List[Dict[str, Any]] = []
+    pending: List[Tuple[int, Event]] = []
+    
+    def parse(line_no: int, line: Optional[bytes]):
+        nonlocal count, rejected
+        count += 1
+        try:
+            if line is None:
+                raise ValueError(f"Line exceeds {PUBLISH_STREAM_MAX_LINE_BYTES} bytes")
+            pending.append((line_no, Event.model_validate(json_codec.loads(line))))
+        except (ValueError, ValidationError) as e:
+            rejected += 1
+            _add_stream_error(errors, {"index": line_no, "error": str(e), "retryable": False})
+    
+    async def consume(lines) -> bool:
+        # Baris diproses sambil decoder berjalan: yang tertahan hanya satu langkah dekompresi + satu batch
+        for line_no, line in lines:
+            parse(line_no, line)
+            if len(pending) >= PUBLISH_STREAM_BATCH_SIZE and not await flush():
+                return False
+        return True
+    
+    async def flush() -> bool:
+        nonlocal accepted, rejected, shed, pending
+        batch, pending = pending, []
+        batch_accepted, batch_shed, failed = await _ingest_stream_batch(batch, errors)
+        accepted += batch_accepted
+        shed += batch_shed
+        rejected += batch_shed
+        return not failed
     
+    try:
+        async for chunk in request.stream():
+            if not await consume(decoder.feed(chunk)):
+                break
+        else:
+            if await consume(decoder.close()):
+                await flush()
+    except ValueError as e:
+        # Body korup / terpotong: selalu 400, tetapi event sebelumnya sudah di-enqueue
+        # sehingga body response tetap melaporkan accepted dan error per baris
+        logger.warning(f"Aborting NDJSON stream after {count} lines: {e}")
+        if pending:
+            await flush()
+        errors.append({"error": str(e), "retryable": False})
+        return JSONResponse(status_code=400, content=PublishResponse(
+            status="partial" if accepted else "rejected",
+            count=count, accepted=accepted, rejected=rejected, errors=errors
+        ).dict())
+    except ClientDisconnect:
+        logger.warning(f"Client disconnected from NDJSON stream after {count} lines ({accepted} accepted)")
+        if pending:
+            await flush()
+        return PublishResponse(status="partial", count=count, accepted=accepted, rejected=rejected, errors=errors)
+    
+    logger.info(
+        f"NDJSON stream: {count} lines, {accepted} accepted, {rejected} rejected, "
+        f"{decoder.bytes_in} bytes in / {decoder.bytes_out} bytes decoded"
+    )
+    return _publish_response(count, accepted, rejected, errors, shed > 0, response)
+
+
+def encode_cursor(key: Tuple[datetime, int]) -> str:
+    """Encode keyset (processed_at, id) menjadi cursor opaque"""
+    processed_at, event_pk = key
+    raw = f"{processed_at.isoformat()}|{event_pk}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode cursor dari encode_cursor; ValueError jika tidak valid"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        processed_at, event_pk = raw.split("|", 1)
+        return datetime.fromisoformat(processed_at), int(event_pk)
     except Exception as e:
-        logger.error(f"Error in publish endpoint: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        raise ValueError(f"Invalid cursor: {cursor}") from e
 
 
-@app.get("/events", response_model=List[EventResponse], tags=["Events"])
-async def get_events(topic: Optional[str] = Query(None, description="Filter by topic")):
+def _to_db_time(value: Optional[datetime]) -> Optional[datetime]:
+    """processed_at disimpan sebagai TIMESTAMP UTC tanpa timezone (default now() AT TIME ZONE 'UTC')"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
 
+
+_EVENT_RESPONSE_FIELDS = tuple(EventResponse.model_fields)
+
+
+@app.get(
+    "/events",
+    response_model=List[EventResponse],
+    tags=["Events"],
+    responses={200: {"content": {MSGPACK_MEDIA_TYPE: {}}}},
+)
+async def get_events(
+    request: Request,
+    topic: Optional[str] = Query(None, description="Filter by topic"),
+    limit: int = Query(EVENTS_DEFAULT_PAGE_SIZE, ge=1, description=f"Page size (maks {EVENTS_MAX_PAGE_SIZE})"),
+    after: Optional[str] = Query(None, description="Cursor dari header X-Next-Cursor halaman sebelumnya"),
+    since: Optional[datetime] = Query(None, description="processed_at >= since (ISO8601)"),
+    until: Optional[datetime] = Query(None, description="processed_at < until (ISO8601)")
+):
+    # Batas keras ukuran halaman di sisi server
+    limit = min(limit, EVENTS_MAX_PAGE_SIZE)
     try:
-        events = await get_events_by_topic(topic)
-        return events
+        after_key = decode_cursor(after) if after else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        use_msgpack = msgpack_codec.accepts_msgpack(request.headers.get("accept"))
+        headers = {"Vary": "Accept"}
+        if EVENTS_JSON_SOURCE == "postgres" and not use_msgpack:
+            # Body JSON dibangun PostgreSQL, diteruskan apa adanya tanpa objek per baris
+            body, next_key = await get_events_page_json(
+                topic, limit, after_key, since=_to_db_time(since), until=_to_db_time(until)
+            )
+            if next_key is not None:
+                headers["X-Next-Cursor"] = encode_cursor(next_key)
+            return Response(content=body, media_type="application/json", headers=headers)
+        
+        events, next_key = await get_events_page(
+            topic, limit, after_key, since=_to_db_time(since), until=_to_db_time(until)
+        )
+        if next_key is not None:
+            headers["X-Next-Cursor"] = encode_cursor(next_key)
+        # Field sama dengan EventResponse, di-encode langsung tanpa validasi response_model
+        page = [{field: event[field] for field in _EVENT_RESPONSE_FIELDS} for event in events]
+        if use_msgpack:
+            return Response(content=msgpack_codec.packb(page), media_type=MSGPACK_MEDIA_TYPE, headers=headers)
+        return json_response(page, headers=headers)
     except Exception as e:
         logger.error(f"Error getting events: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/events/stream", tags=["Events"])
+async def stream_all_events(
+    topic: Optional[str] = Query(None, description="Filter by topic"),
+    since: Optional[datetime] = Query(None, description="processed_at >= since (ISO8601)"),
+    until: Optional[datetime] = Query(None, description="processed_at < until (ISO8601)")
+):
+    """Export event sebagai NDJSON, dibaca per chunk lewat server-side cursor"""
+    async def ndjson_lines():
+        # Status 200 sudah terkirim: error di-raise supaya server memutus response tanpa
+        # chunk penutup, sehingga client melihat export terpotong, bukan selesai normal
+        try:
+            async for chunk in stream_events(
+                topic,
+                since=_to_db_time(since),
+                until=_to_db_time(until),
+                chunk_size=EVENTS_STREAM_CHUNK_SIZE,
+                stall_timeout=EVENTS_STREAM_STALL_TIMEOUT_S
+            ):
+                yield b"".join(json_codec.dumps_bytes(event) + b"\n" for event in chunk)
+        except asyncio.TimeoutError:
+            logger.warning("Event stream aborted: client too slow, database connection released")
+            raise
+        except Exception as e:
+            logger.error(f"Error streaming events: {e}")
+            raise
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+
 @app.post("/events", response_model=PublishResponse, tags=["Events"])
-async def post_events(request: PublishRequest):
-    return await publish_events(request)
+async def post_events(request: PublishRequest, response: Response):
+    return await _publish(request, response)
 
 
 @app.get("/stats", response_model=StatsResponse, tags=["Statistics"])
 async def get_aggregator_stats():
     try:
-        stats = await get_stats()
-        topics = await get_topics()
+        # Counter dan topic dari cache; state in-process di bawah selalu live
+        stats, topics = await cached_db_stats()
         uptime = time.time() - _startup_time
         
         total = stats["received"]
@@ -212,16 +1322,25 @@ async def get_aggregator_stats():
         
         unique_rate = (unique / total * 100) if total > 0 else 0
         duplicate_rate = (duplicate / total * 100) if total > 0 else 0
+        workers = get_worker_stats()
         
-        return StatsResponse(
+        return json_response(StatsResponse(
             received=total,
             unique_processed=unique,
             duplicate_dropped=duplicate,
             topics=topics,
             uptime_seconds=uptime,
             unique_rate=round(unique_rate, 2),
-            duplicate_rate=round(duplicate_rate, 2)
-        )
+            duplicate_rate=round(duplicate_rate, 2),
+            queue_depth=sum(w["queue_depth"] for w in workers),
+            workers=workers,
+            dedup_filter=_dedup_filter.stats() if _dedup_filter is not None else None,
+            recent_keys=_recent_keys.stats() if _recent_keys is not None else None,
+            spool=_spool.stats() if _spool is not None else None,
+            broker=await _broker.stats() if _broker is not None else None,
+            process_index=int(AGGREGATOR_PROCESS_INDEX or 0),
+            pid=os.getpid()
+        ))
     except Exception as e:
         logger.error(f"Error getting stats: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -229,21 +1348,53 @@ async def get_aggregator_stats():
 
 @app.post("/admin/clear", tags=["Admin"])
 async def admin_clear_data():
+    global _clear_generation
     try:
-        from src.database import clear_all_data
-        await clear_all_data()
+        # Proses lain melihat generation baru lewat clear_watcher (maks. CLEAR_POLL_INTERVAL_MS)
+        _clear_generation = await clear_all_data()
+        reset_local_caches()
         return {"status": "success", "message": "All data cleared"}
     except Exception as e:
         logger.error(f"Error clearing data: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/admin/retention", tags=["Admin"])
+async def admin_retention_status():
+    try:
+        return {
+            "tables": await get_retention_status(),
+            "reaper": _retention_runs,
+        }
+    except Exception as e:
+        logger.error(f"Error getting retention status: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/admin/statements", tags=["Admin"])
+async def admin_statement_stats():
+    """Jumlah eksekusi dan latency (ms) per prepared statement hot path"""
+    return {"statements": get_statement_stats()}
+
+
+@app.post("/admin/dedup-filter/rebuild", tags=["Admin"])
+async def admin_rebuild_dedup_filter():
+    global _filter_warmup_task
+    if _dedup_filter is None:
+        raise HTTPException(status_code=400, detail="Dedup filter is disabled")
+    if _filter_warmup_task and not _filter_warmup_task.done():
+        return {"status": "in_progress", "message": "Dedup filter rebuild already running"}
+    
+    _filter_warmup_task = asyncio.create_task(warm_dedup_filter())
+    return {"status": "started", "message": "Dedup filter rebuild started"}
+
+
 @app.get("/info", tags=["Info"])
 async def get_info():
     uptime = time.time() - _startup_time
     event_count = await get_event_count()
     
-    return {
+    return json_response({
         "service": "Pub-Sub Log Aggregator",
         "version": "1.0.0",
         "uptime_seconds": uptime,
@@ -252,13 +1403,22 @@ async def get_info():
         "features": [
             "Idempotent consumer",
             "At-least-once delivery",
-            "SERIALIZABLE transaction isolation",
+            "Configurable transaction isolation with serialization retries",
             "Unique constraint deduplication",
-            "Concurrent processing",
+            "Concurrent processing (topic-partitioned consumer workers)",
             "Event batching",
-            "Persistent dedup store"
+            "Batched set-based consumer commits",
+            "Persistent dedup store",
+            "Bloom filter dedup fast path",
+            "LRU cache for hot duplicates",
+            "Durable write-ahead spool with group-commit fsync",
+            "Redis Streams ingest broker (consumer groups, XAUTOCLAIM)",
+            "Multi-process SO_REUSEPORT launcher",
+            "NDJSON streaming ingest (gzip/zstd)",
+            "MessagePack ingest and responses",
+            "Pre-serialized orjson responses for read endpoints"
         ]
-    }
+    })
 
 
 if __name__ == "__main__":
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import Dict, Any, List, Union
+from pydantic import BaseModel, Field, TypeAdapter
+from typing import Dict, Any, List, Optional, Union
 from datetime import datetime
 import uuid
 
@@ -30,6 +30,10 @@ class Event(BaseModel):
         }
 
 
+# Validator batch untuk /publish/batch: validasi List[Event] dalam satu panggilan
+EVENT_LIST_ADAPTER = TypeAdapter(List[Event])
+
+
 class PublishRequest(BaseModel):
     """Request model untuk publish event (single atau batch)"""
     events: Union[Event, List[Event]] = Field(..., description="Single event atau list of events")
@@ -59,6 +63,72 @@ class EventResponse(BaseModel):
     payload: Dict[str, Any]
 
 
+class WorkerStats(BaseModel):
+    """Statistik per consumer worker"""
+    worker_id: int
+    queue_depth: int = Field(description="Jumlah event yang menunggu di sub-queue worker")
+    processed: int
+    unique_processed: int
+    duplicate_dropped: int
+    batches: int
+    errors: int
+    dead_lettered: int = Field(default=0, description="Event yang ditolak database dan dipindah ke dead_letter_events")
+    events_per_second: float = Field(description="Rata-rata throughput sejak startup")
+
+
+class DedupFilterStats(BaseModel):
+    """Statistik Bloom filter di depan dedup_store"""
+    enabled: bool
+    ready: bool = Field(description="False selama warm-up dari dedup_store")
+    hits: int = Field(description="Lookup 'mungkin sudah dilihat' (tetap dicek ke database)")
+    misses: int = Field(description="Lookup 'pasti baru' (existence check dilewati)")
+    hit_rate: float
+    keys: int
+    capacity: int
+    memory_bytes: int
+    false_positive_rate: float
+    rotations: int
+
+
+class RecentKeyCacheStats(BaseModel):
+    """Statistik cache LRU key yang baru di-commit"""
+    size: int
+    max_size: int
+    ttl_seconds: float
+    hits: int = Field(description="Duplikat yang di-drop tanpa I/O database")
+    misses: int
+    hit_rate: float
+    evictions: int
+    expirations: int
+
+
+class SpoolStats(BaseModel):
+    """Statistik write-ahead spool event yang belum di-commit"""
+    directory: str
+    segments: int
+    bytes: int
+    next_lsn: int
+    checkpoint: int = Field(description="LSN tertinggi yang semua LSN di bawahnya sudah di-commit")
+    persisted_checkpoint: int
+    unacked: int = Field(description="Event di spool yang belum di-commit consumer")
+    appended: int
+    fsyncs: int
+    avg_group_size: float = Field(description="Rata-rata record per fsync (group commit)")
+    replayed: int = Field(description="Event yang di-replay saat startup")
+
+
+class BrokerStats(BaseModel):
+    """Statistik broker Redis Streams"""
+    stream: str
+    group: str
+    length: int = Field(description="Entry di stream (belum di-commit)")
+    pending: int = Field(description="Entry yang sudah dibaca consumer tapi belum di-ack")
+    published: int
+    acked: int
+    reclaimed: int = Field(description="Entry stalled yang diambil alih lewat XAUTOCLAIM")
+    dropped: int = Field(description="Entry yang tidak bisa di-decode")
+
+
 class StatsResponse(BaseModel):
     """Response dari /stats endpoint"""
     received: int = Field(description="Total event diterima")
@@ -68,6 +138,17 @@ class StatsResponse(BaseModel):
     uptime_seconds: float = Field(description="Uptime dalam detik")
     unique_rate: float = Field(description="Persentase event yang unik")
     duplicate_rate: float = Field(description="Persentase duplikat")
+    queue_depth: int = Field(default=0, description="Total event yang menunggu di semua sub-queue")
+    workers: List[WorkerStats] = Field(default_factory=list, description="Statistik per consumer worker")
+    dedup_filter: Optional[DedupFilterStats] = Field(default=None, description="Statistik Bloom filter dedup")
+    recent_keys: Optional[RecentKeyCacheStats] = Field(default=None, description="Statistik cache key terbaru")
+    spool: Optional[SpoolStats] = Field(default=None, description="Statistik durable spool")
+    broker: Optional[BrokerStats] = Field(default=None, description="Statistik broker Redis Streams")
+    process_index: int = Field(
+        default=0,
+        description="Proses yang menjawab (multi-process); queue/workers/cache di atas milik proses ini"
+    )
+    pid: Optional[int] = None
 
 
 class HealthResponse(BaseModel):
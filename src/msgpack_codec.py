@@ -0,0 +1,68 @@
+"""
+MessagePack sebagai alternatif JSON di wire untuk ingest (/publish,
+/publish/batch) dan GET /events, dengan schema Event yang sama.
+
+msgpack opsional: tanpa package ini body msgpack ditolak (415) dan
+Accept msgpack dijawab JSON.
+"""
+
+from typing import Any, Optional
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - msgpack opsional
+    msgpack = None
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+_MSGPACK_MEDIA_TYPES = {MSGPACK_MEDIA_TYPE, "application/x-msgpack", "application/vnd.msgpack"}
+
+
+def _media_type(value: str) -> str:
+    return value.split(";", 1)[0].strip().lower()
+
+
+def is_msgpack(content_type: Optional[str]) -> bool:
+    """True jika Content-Type request adalah msgpack"""
+    return bool(content_type) and _media_type(content_type) in _MSGPACK_MEDIA_TYPES
+
+
+def accepts_msgpack(accept: Optional[str]) -> bool:
+    """
+    Negosiasi Accept: msgpack dipilih jika disebut eksplisit dengan q tidak
+    lebih rendah dari application/json (atau */* jika json tidak disebut).
+    """
+    if not accept or msgpack is None:
+        return False
+    msgpack_q, json_q = 0.0, 0.0
+    for entry in accept.split(","):
+        media_type, *params = entry.split(";")
+        media_type = media_type.strip().lower()
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if media_type in _MSGPACK_MEDIA_TYPES:
+            msgpack_q = max(msgpack_q, q)
+        elif media_type in ("application/json", "application/*", "*/*"):
+            json_q = max(json_q, q)
+    return msgpack_q > 0 and msgpack_q >= json_q
+
+
+def packb(value: Any) -> bytes:
+    if msgpack is None:
+        raise RuntimeError("msgpack is not installed")
+    return msgpack.packb(value, use_bin_type=True)
+
+
+def unpackb(data: bytes) -> Any:
+    """Decode body msgpack; RuntimeError jika msgpack tidak terpasang, ValueError jika body invalid"""
+    if msgpack is None:
+        raise RuntimeError("msgpack is not installed")
+    try:
+        return msgpack.unpackb(data, raw=False)
+    except Exception as e:
+        raise ValueError(f"Invalid msgpack body: {e}") from e
@@ -0,0 +1,175 @@
+"""
+Decoder NDJSON inkremental untuk POST /publish/stream.
+
+Chunk body request di-dekompresi (Content-Encoding gzip / zstd) lalu
+dipotong per baris begitu tiba, sehingga memori per request dibatasi oleh
+ukuran chunk + satu baris, bukan ukuran body. Baris yang lebih panjang
+dari max_line_bytes dibuang (dilaporkan sebagai None) tanpa di-buffer.
+"""
+
+import zlib
+from typing import Iterator, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstandard opsional
+    zstandard = None
+
+# Batas output dekompresi per langkah (mencegah satu chunk kecil mengembang ke ukuran besar sekaligus)
+_DECOMPRESS_STEP_BYTES = 256 * 1024
+# zstd tidak punya batas output per panggilan: input diberikan per potongan kecil.
+# Blok RLE zstd (4 byte -> 128 KiB) membatasi output per langkah ~4 MiB.
+_ZSTD_INPUT_STEP_BYTES = 128
+
+
+class _Identity:
+    def decompress(self, data: bytes) -> Iterator[bytes]:
+        yield data
+
+    def flush(self) -> Iterator[bytes]:
+        return iter(())
+
+
+class _Gzip:
+    """gzip/zlib, termasuk body multi-member (gzip(a) + gzip(b), output pigz / file log yang digabung)"""
+
+    def __init__(self):
+        self._obj = None
+
+    def decompress(self, data: bytes) -> Iterator[bytes]:
+        while data:
+            if self._obj is None or self._obj.eof:
+                # Member berikutnya dimulai dari unused_data member sebelumnya
+                # 32 + MAX_WBITS: deteksi header gzip atau zlib otomatis
+                self._obj = zlib.decompressobj(32 + zlib.MAX_WBITS)
+            try:
+                out = self._obj.decompress(data, _DECOMPRESS_STEP_BYTES)
+            except zlib.error as e:
+                raise ValueError(f"Invalid gzip body: {e}") from e
+            data = self._obj.unused_data if self._obj.eof else self._obj.unconsumed_tail
+            if out:
+                yield out
+
+    def flush(self) -> Iterator[bytes]:
+        if self._obj is None:
+            return
+        out = self._obj.flush()
+        if out:
+            yield out
+        if not self._obj.eof:
+            raise ValueError("Truncated gzip body")
+
+
+class _Zstd:
+    """zstd, termasuk body multi-frame"""
+
+    def __init__(self):
+        self._decompressor = zstandard.ZstdDecompressor()
+        self._obj = None
+
+    def decompress(self, data: bytes) -> Iterator[bytes]:
+        view = memoryview(data)
+        while view:
+            if self._obj is None or self._obj.eof:
+                self._obj = self._decompressor.decompressobj()
+            step, view = view[:_ZSTD_INPUT_STEP_BYTES], view[_ZSTD_INPUT_STEP_BYTES:]
+            try:
+                out = self._obj.decompress(step.tobytes())
+            except zstandard.ZstdError as e:
+                raise ValueError(f"Invalid zstd body: {e}") from e
+            if self._obj.eof and self._obj.unused_data:
+                # Frame selesai di tengah potongan: sisanya milik frame berikutnya
+                view = memoryview(self._obj.unused_data + view.tobytes())
+            if out:
+                yield out
+
+    def flush(self) -> Iterator[bytes]:
+        if self._obj is not None and not self._obj.eof:
+            raise ValueError("Truncated zstd body")
+        return iter(())
+
+
+def supported_encodings() -> List[str]:
+    encodings = ["identity", "gzip"]
+    if zstandard is not None:
+        encodings.append("zstd")
+    return encodings
+
+
+def _decompressor(encoding: Optional[str]):
+    encoding = (encoding or "identity").strip().lower()
+    if encoding == "identity":
+        return _Identity()
+    if encoding in ("gzip", "x-gzip"):
+        return _Gzip()
+    if encoding == "zstd" and zstandard is not None:
+        return _Zstd()
+    raise ValueError(f"Unsupported Content-Encoding: {encoding} (supported: {', '.join(supported_encodings())})")
+
+
+class NDJSONDecoder:
+    """
+    feed(chunk) dan close() adalah generator (nomor baris, bytes baris | None)
+    untuk setiap baris lengkap; close() juga mengembalikan baris terakhir tanpa
+    newline. Baris dihasilkan per langkah dekompresi, jadi pemanggil yang
+    memproses baris sambil iterasi hanya menahan satu langkah di memori.
+    Nomor baris 0-based dan ikut menghitung baris kosong (yang tidak
+    dikembalikan). ValueError untuk Content-Encoding tidak didukung, body
+    korup atau body terkompresi yang terpotong.
+    """
+
+    def __init__(self, content_encoding: Optional[str] = None, max_line_bytes: int = 1024 * 1024):
+        self._decompressor = _decompressor(content_encoding)
+        self.max_line_bytes = max_line_bytes
+        self._buffer = bytearray()
+        self._oversized = False
+        self._line_no = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def _emit(self, line: bytes) -> Iterator[Tuple[int, Optional[bytes]]]:
+        line_no = self._line_no
+        self._line_no += 1
+        if self._oversized:
+            self._oversized = False
+            yield line_no, None
+        elif line.strip():
+            yield line_no, line
+
+    def _split(self, data: bytes) -> Iterator[Tuple[int, Optional[bytes]]]:
+        self.bytes_out += len(data)
+        start = 0
+        while True:
+            end = data.find(b"\n", start)
+            if end < 0:
+                break
+            if self._buffer:
+                self._buffer += data[start:end]
+                line = bytes(self._buffer)
+                self._buffer.clear()
+            else:
+                line = data[start:end]
+            if len(line) > self.max_line_bytes:
+                self._oversized = True
+            yield from self._emit(line)
+            start = end + 1
+
+        if not self._oversized:
+            self._buffer += data[start:]
+            if len(self._buffer) > self.max_line_bytes:
+                # Sisa baris ini dibuang sampai newline berikutnya
+                self._oversized = True
+                self._buffer.clear()
+
+    def feed(self, chunk: bytes) -> Iterator[Tuple[int, Optional[bytes]]]:
+        self.bytes_in += len(chunk)
+        for data in self._decompressor.decompress(chunk):
+            yield from self._split(data)
+
+    def close(self) -> Iterator[Tuple[int, Optional[bytes]]]:
+        for data in self._decompressor.flush():
+            yield from self._split(data)
+        if self._buffer or self._oversized:
+            line = bytes(self._buffer)
+            self._buffer.clear()
+            yield from self._emit(line)
@@ -0,0 +1,75 @@
+"""
+Cache LRU (opsional dengan TTL) untuk key (topic, event_id) yang baru saja di-commit.
+
+Publisher at-least-once biasanya mengirim ulang event yang baru dikirim,
+sehingga sebagian besar duplikat adalah key yang baru beberapa detik lalu
+di-commit. Cache ini exact (bukan probabilistik): key yang ada di cache
+pasti sudah ada di database, karena cache hanya diisi setelah commit.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Tuple
+
+Key = Tuple[str, str]
+
+
+class RecentKeyCache:
+    """LRU cache berukuran tetap untuk key yang sudah di-commit"""
+
+    def __init__(self, max_size: int, ttl_seconds: float = 0):
+        if max_size <= 0:
+            raise ValueError("max_size must be positive")
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Key, float]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def contains(self, key: Key) -> bool:
+        """True jika key sudah di-commit baru-baru ini (duplikat pasti)"""
+        committed_at = self._entries.get(key)
+        if committed_at is None:
+            self.misses += 1
+            return False
+
+        if self.ttl_seconds and time.monotonic() - committed_at > self.ttl_seconds:
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return False
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return True
+
+    def add_many(self, keys: Iterable[Key]):
+        """Tambahkan key yang sudah di-commit; key paling lama dibuang saat penuh"""
+        now = time.monotonic()
+        for key in keys:
+            self._entries[key] = now
+            self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups * 100, 2) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
@@ -0,0 +1,162 @@
+"""
+Launcher multi-process aggregator.
+
+N proses uvicorn masing-masing membuka socket sendiri pada host:port yang
+sama dengan SO_REUSEPORT, sehingga kernel membagi koneksi masuk ke semua
+proses dan parsing JSON + validasi pydantic berjalan di N core. Setiap
+proses punya pipeline ingest sendiri (queue + consumer workers, atau
+consumer group Redis Streams yang sama jika INGEST_BROKER=redis); stats
+global tetap benar karena counter ditulis ke event_stats_shards di
+PostgreSQL. Schema di-init sekali oleh parent sebelum worker dijalankan.
+DB_POOL_MAX adalah budget connection total: setiap proses mendapat
+DB_POOL_MAX // N supaya N proses tidak melewati max_connections PostgreSQL.
+
+    AGGREGATOR_PROCESSES=4 python -m src.server --host 0.0.0.0 --port 8080
+"""
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from typing import Tuple
+
+import uvicorn
+
+logger = logging.getLogger(__name__)
+
+AGGREGATOR_PROCESSES = int(os.getenv("AGGREGATOR_PROCESSES", str(os.cpu_count() or 1)))
+RESTART_BACKOFF_S = float(os.getenv("AGGREGATOR_RESTART_BACKOFF_S", "1"))
+INIT_RETRY_INTERVAL_S = 2
+
+
+def reuseport_socket(host: str, port: int) -> socket.socket:
+    """Socket listen dengan SO_REUSEPORT (satu per proses)"""
+    if not hasattr(socket, "SO_REUSEPORT"):
+        raise RuntimeError("SO_REUSEPORT is not supported on this platform")
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.set_inheritable(True)
+    return sock
+
+
+def pool_budget(processes: int) -> Tuple[int, int]:
+    """Bagi budget pool total (DB_POOL_MIN/DB_POOL_MAX) ke setiap proses: (min, max) per proses"""
+    from src.database import DB_POOL_MIN, DB_POOL_MAX
+
+    pool_max = max(1, DB_POOL_MAX // processes)
+    if pool_max * processes > DB_POOL_MAX:
+        logger.warning(
+            f"DB_POOL_MAX={DB_POOL_MAX} is smaller than AGGREGATOR_PROCESSES={processes}: "
+            f"{pool_max * processes} connections can be opened"
+        )
+    return min(DB_POOL_MIN, pool_max), pool_max
+
+
+def run_worker(index: int, processes: int, pool_size: Tuple[int, int], host: str, port: int, log_level: str):
+    """Entry point proses worker"""
+    # Dibaca src.main / src.database saat import: identitas proses, spool, tugas singleton, pool
+    os.environ["AGGREGATOR_PROCESS_INDEX"] = str(index)
+    os.environ["AGGREGATOR_PROCESSES"] = str(processes)
+    os.environ["INIT_DB_ON_STARTUP"] = "false"
+    os.environ["DB_POOL_MIN"] = str(pool_size[0])
+    os.environ["DB_POOL_MAX"] = str(pool_size[1])
+
+    sock = reuseport_socket(host, port)
+    config = uvicorn.Config("src.main:app", log_level=log_level, lifespan="on")
+    server = uvicorn.Server(config)
+    asyncio.run(server.serve(sockets=[sock]))
+
+
+async def init_schema():
+    """Init schema sekali sebelum worker start (hindari DDL concurrent dari N proses)"""
+    from src.database import init_pool, init_db, close_pool
+
+    # Postgres bisa belum siap saat launcher start (mis. docker compose): retry seperti lifespan
+    max_retries = 10
+    try:
+        for attempt in range(1, max_retries + 1):
+            try:
+                await init_pool()
+                await init_db()
+                return
+            except Exception as e:
+                if attempt >= max_retries:
+                    logger.error(f"Failed to initialize database after {max_retries} retries: {e}")
+                    raise
+                logger.warning(f"Database connection failed (attempt {attempt}/{max_retries}): {e}")
+                await asyncio.sleep(INIT_RETRY_INTERVAL_S)
+    finally:
+        await close_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--processes", type=int, default=AGGREGATOR_PROCESSES)
+    parser.add_argument("--log-level", default=os.getenv("LOG_LEVEL", "info").lower())
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    asyncio.run(init_schema())
+    # Semua worker melaporkan uptime sejak launcher start
+    os.environ.setdefault("AGGREGATOR_STARTED_AT", str(time.time()))
+
+    pool_size = pool_budget(args.processes)
+    ctx = multiprocessing.get_context("spawn")
+    workers = {}
+
+    def start(index: int):
+        process = ctx.Process(
+            target=run_worker,
+            args=(index, args.processes, pool_size, args.host, args.port, args.log_level),
+            name=f"aggregator-{index}",
+        )
+        process.start()
+        workers[index] = process
+        logger.info(f"Started aggregator process {index} (pid={process.pid})")
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for process in workers.values():
+            if process.is_alive():
+                process.terminate()  # SIGTERM: uvicorn menjalankan shutdown lifespan
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for index in range(args.processes):
+        start(index)
+    logger.info(
+        f"{args.processes} aggregator processes listening on {args.host}:{args.port} (SO_REUSEPORT), "
+        f"DB pool {pool_size[0]}-{pool_size[1]} per process"
+    )
+
+    while not stopping:
+        time.sleep(RESTART_BACKOFF_S)
+        for index, process in list(workers.items()):
+            if not process.is_alive() and not stopping:
+                logger.warning(f"Aggregator process {index} exited with {process.exitcode}, restarting")
+                start(index)
+
+    for process in workers.values():
+        process.join()
+    logger.info("All aggregator processes stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""
+Write-ahead spool lokal untuk event yang sudah diterima /publish tetapi
+belum di-commit consumer.
+
+Event di-append ke segment file append-only sebelum /publish menjawab.
+fsync di-group-commit: semua append dalam satu window menunggu satu fsync
+yang sama, sehingga biaya durability dibagi ke banyak request tanpa round
+trip ke database. Setiap record punya LSN naik monoton; consumer meng-ack
+LSN setelah commit, dan checkpoint (LSN tertinggi yang semua LSN di
+bawahnya sudah di-ack) ditulis periodik. Segment yang seluruhnya di bawah
+checkpoint dihapus, sisanya di-replay saat startup. Replay bisa mengirim
+ulang event yang sudah di-commit; dedup di database membuatnya idempotent.
+
+Format record: length (4 byte) | crc32 (4 byte) | lsn (8 byte) | data.
+Record terakhir yang terpotong (crash di tengah write) dibuang saat replay.
+"""
+
+import asyncio
+import logging
+import os
+import struct
+import zlib
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct("<IIQ")
+_SEGMENT_PREFIX = "segment-"
+_SEGMENT_SUFFIX = ".log"
+_CHECKPOINT_FILE = "checkpoint"
+
+
+def _segment_name(first_lsn: int) -> str:
+    return f"{_SEGMENT_PREFIX}{first_lsn:020d}{_SEGMENT_SUFFIX}"
+
+
+def _fsync_dir(path: str):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def read_segment(path: str) -> Tuple[List[Tuple[int, bytes]], int]:
+    """Baca record valid dari segment; return (records, offset akhir record valid terakhir)"""
+    records = []
+    offset = 0
+    with open(path, "rb") as f:
+        data = f.read()
+    while offset + _HEADER.size <= len(data):
+        length, crc, lsn = _HEADER.unpack_from(data, offset)
+        start = offset + _HEADER.size
+        body = data[start:start + length]
+        if len(body) < length or zlib.crc32(body) != crc:
+            break
+        records.append((lsn, body))
+        offset = start + length
+    return records, offset
+
+
+class Spool:
+    """Spool append-only dengan segment rotation, group-commit fsync dan checkpoint"""
+
+    def __init__(self, directory: str, segment_bytes: int = 64 * 1024 * 1024, group_commit_ms: float = 2):
+        if segment_bytes <= 0:
+            raise ValueError("segment_bytes must be positive")
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.group_commit_ms = group_commit_ms
+
+        self._file = None
+        self._file_size = 0
+        self._segments: List[Tuple[int, str]] = []  # (first_lsn, path), urut naik
+        self._next_lsn = 1
+        self._checkpoint = 0
+        self._persisted_checkpoint = 0
+
+        # LSN yang belum di-ack, urut append; ack di luar urutan dicatat di _acked
+        self._in_flight: deque = deque()
+        self._acked = set()
+
+        self._waiters: List[asyncio.Future] = []
+        self._commit_task: Optional[asyncio.Task] = None
+
+        self.appended = 0
+        self.fsyncs = 0
+        self.replayed = 0
+
+    # -- startup ---------------------------------------------------------
+
+    def _checkpoint_path(self) -> str:
+        return os.path.join(self.directory, _CHECKPOINT_FILE)
+
+    def _read_checkpoint(self) -> int:
+        try:
+            with open(self._checkpoint_path(), "r") as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def open(self) -> List[Tuple[int, bytes]]:
+        """
+        Buka spool dan return record yang belum di-checkpoint (untuk replay).
+        Record replay ikut dilacak sebagai in-flight sampai di-ack.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        self._checkpoint = self._persisted_checkpoint = self._read_checkpoint()
+
+        names = sorted(
+            name for name in os.listdir(self.directory)
+            if name.startswith(_SEGMENT_PREFIX) and name.endswith(_SEGMENT_SUFFIX)
+        )
+        pending = []
+        last_lsn = self._checkpoint
+        for name in names:
+            path = os.path.join(self.directory, name)
+            records, valid_bytes = read_segment(path)
+            if valid_bytes < os.path.getsize(path):
+                logger.warning(f"Spool segment {name} has a torn tail, truncating to {valid_bytes} bytes")
+                with open(path, "r+b") as f:
+                    f.truncate(valid_bytes)
+            first_lsn = int(name[len(_SEGMENT_PREFIX):-len(_SEGMENT_SUFFIX)])
+            self._segments.append((first_lsn, path))
+            for lsn, body in records:
+                last_lsn = max(last_lsn, lsn)
+                if lsn > self._checkpoint:
+                    pending.append((lsn, body))
+
+        self._next_lsn = last_lsn + 1
+        self._in_flight.extend(lsn for lsn, _ in pending)
+        self.replayed = len(pending)
+        # Append baru selalu ke segment baru, tidak menyambung tail lama
+        self._open_segment()
+        self._remove_consumed_segments()
+        return pending
+
+    def _open_segment(self):
+        path = os.path.join(self.directory, _segment_name(self._next_lsn))
+        self._file = open(path, "ab")
+        self._file_size = self._file.tell()
+        if not self._segments or self._segments[-1][1] != path:
+            self._segments.append((self._next_lsn, path))
+        _fsync_dir(self.directory)
+
+    # -- append / group commit -------------------------------------------
+
+    async def append(self, items: List[bytes]) -> List[int]:
+        """Append record dan tunggu sampai durable (fsync); return LSN per record"""
+        if not items:
+            return []
+        lsns = []
+        chunks = []
+        for body in items:
+            lsn = self._next_lsn
+            self._next_lsn += 1
+            chunks.append(_HEADER.pack(len(body), zlib.crc32(body), lsn))
+            chunks.append(body)
+            lsns.append(lsn)
+        data = b"".join(chunks)
+        self._file.write(data)
+        self._file_size += len(data)
+        self._in_flight.extend(lsns)
+        self.appended += len(lsns)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        if self._commit_task is None or self._commit_task.done():
+            self._commit_task = asyncio.create_task(self._group_commit())
+        try:
+            await waiter
+        except BaseException:
+            # fsync gagal / append dibatalkan: caller tidak meng-enqueue event ini,
+            # jadi LSN-nya tidak akan pernah di-ack dan akan menahan checkpoint
+            self.ack(lsns)
+            raise
+        return lsns
+
+    async def _group_commit(self):
+        loop = asyncio.get_running_loop()
+        while self._waiters:
+            if self.group_commit_ms > 0:
+                await asyncio.sleep(self.group_commit_ms / 1000)
+
+            # Snapshot tanpa await: semua waiter ini menulis ke file yang sama
+            waiters, self._waiters = self._waiters, []
+            file = self._file
+            file.flush()
+            rotate = self._file_size >= self.segment_bytes
+            if rotate:
+                self._open_segment()
+
+            try:
+                await loop.run_in_executor(None, os.fsync, file.fileno())
+                self.fsyncs += 1
+            except Exception as e:
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_exception(e)
+                continue
+            finally:
+                if rotate:
+                    file.close()
+
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(None)
+
+    # -- ack / checkpoint ------------------------------------------------
+
+    def ack(self, lsns):
+        """Tandai LSN sudah di-commit consumer dan majukan checkpoint"""
+        self._acked.update(lsn for lsn in lsns if lsn is not None)
+        while self._in_flight and self._in_flight[0] in self._acked:
+            lsn = self._in_flight.popleft()
+            self._acked.discard(lsn)
+            self._checkpoint = lsn
+
+    def _write_checkpoint(self, checkpoint: int):
+        tmp_path = self._checkpoint_path() + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(str(checkpoint))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._checkpoint_path())
+        _fsync_dir(self.directory)
+
+    def _remove_consumed_segments(self):
+        # Segment i habis jika first_lsn segment berikutnya - 1 <= checkpoint
+        while len(self._segments) > 1 and self._segments[1][0] - 1 <= self._persisted_checkpoint:
+            _, path = self._segments.pop(0)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    async def checkpoint(self):
+        """Persist checkpoint (atomic rename) dan hapus segment yang sudah habis"""
+        checkpoint = self._checkpoint
+        if checkpoint <= self._persisted_checkpoint:
+            return
+        await asyncio.get_running_loop().run_in_executor(None, self._write_checkpoint, checkpoint)
+        self._persisted_checkpoint = checkpoint
+        self._remove_consumed_segments()
+
+    async def close(self):
+        if self._commit_task is not None:
+            await self._commit_task
+        await self.checkpoint()
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "directory": self.directory,
+            "segments": len(self._segments),
+            "bytes": sum(os.path.getsize(path) for _, path in self._segments if os.path.exists(path)),
+            "next_lsn": self._next_lsn,
+            "checkpoint": self._checkpoint,
+            "persisted_checkpoint": self._persisted_checkpoint,
+            "unacked": len(self._in_flight),
+            "appended": self.appended,
+            "fsyncs": self.fsyncs,
+            "avg_group_size": round(self.appended / self.fsyncs, 2) if self.fsyncs else 0.0,
+            "replayed": self.replayed,
+        }
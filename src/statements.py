@@ -0,0 +1,122 @@
+"""
+Registry prepared statement untuk query hot path di database.py.
+
+Setiap statement punya nama tetap dan di-prepare sekali per connection lewat
+hook init pool (connection baru, termasuk setelah pool me-recycle connection),
+sehingga request tidak membayar parse/plan ulang. Statement disimpan di cache
+statement asyncpg milik connection, bukan sebagai objek PreparedStatement:
+asyncpg membatalkan objek PreparedStatement setiap kali connection dikembalikan
+ke pool, sedangkan cache statement connection tetap berlaku lintas acquire.
+Statement yang tabelnya belum ada saat connection dibuat di-prepare lazily saat
+pertama dipakai. Jumlah eksekusi dan latency dicatat per nama statement.
+"""
+
+import logging
+import time
+from collections import deque
+from typing import Any, Dict, Set
+
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+# Jumlah sampel latency terakhir per statement untuk percentile
+LATENCY_WINDOW = 1024
+
+
+class PreparedConnection(asyncpg.Connection):
+    """Connection pool yang mencatat nama statement yang sudah di-prepare"""
+
+    prepared_statements: Set[str]
+
+
+class _StatementStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.prepares = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.recent_ms = deque(maxlen=LATENCY_WINDOW)
+
+    def record(self, elapsed_ms: float, failed: bool):
+        self.calls += 1
+        self.errors += int(failed)
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.recent_ms.append(elapsed_ms)
+
+    def as_dict(self) -> Dict[str, Any]:
+        recent = sorted(self.recent_ms)
+
+        def percentile(p: float) -> float:
+            if not recent:
+                return 0.0
+            return round(recent[min(len(recent) - 1, int(len(recent) * p))], 3)
+
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "prepares": self.prepares,
+            "avg_ms": round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+            "max_ms": round(self.max_ms, 3),
+        }
+
+
+class StatementRegistry:
+    """Nama -> SQL untuk statement yang di-prepare di setiap connection pool"""
+
+    def __init__(self):
+        self._sql: Dict[str, str] = {}
+        self._stats: Dict[str, _StatementStats] = {}
+
+    def register(self, name: str, sql: str) -> str:
+        if name in self._sql:
+            raise ValueError(f"statement {name!r} already registered")
+        self._sql[name] = sql
+        self._stats[name] = _StatementStats()
+        return name
+
+    async def _prepare(self, conn, name: str):
+        # Isi cache statement connection; fetch* dengan SQL yang sama memakainya
+        await conn._get_statement(self._sql[name], None)
+        conn.prepared_statements.add(name)
+        self._stats[name].prepares += 1
+
+    async def prepare_all(self, conn):
+        """Hook init pool: prepare semua statement di connection baru"""
+        conn.prepared_statements = set()
+        for name in self._sql:
+            try:
+                await self._prepare(conn, name)
+            except (asyncpg.UndefinedTableError, asyncpg.UndefinedColumnError) as e:
+                # Skema belum dibuat (init_db belum jalan): prepare saat dipakai
+                logger.debug(f"Deferring prepare of {name}: {e}")
+        # asyncpg mengirim Parse/Describe dengan Flush, bukan Sync: transaksi
+        # implisit tetap terbuka dan lock tabel tertahan sampai query berikutnya.
+        # Tutup di sini supaya DDL (init_db) tidak menunggu connection idle di pool.
+        await conn.execute("SELECT 1")
+
+    async def run(self, conn, name: str, method: str, *args):
+        """Eksekusi statement bernama dengan fetch/fetchval/fetchrow dan catat latency"""
+        if name not in conn.prepared_statements:
+            await self._prepare(conn, name)
+
+        start = time.perf_counter()
+        failed = True
+        try:
+            result = await getattr(conn, method)(self._sql[name], *args)
+            failed = False
+            return result
+        finally:
+            self._stats[name].record((time.perf_counter() - start) * 1000, failed)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: stats.as_dict() for name, stats in self._stats.items()}
+
+    def reset_stats(self):
+        for name in self._stats:
+            self._stats[name] = _StatementStats()
@@ -1,9 +1,10 @@
 import pytest
 import asyncio
+import asyncpg
 import json
 import os
 from typing import List, Dict, Any
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from unittest.mock import patch, MagicMock
 
 # Import dari aplikasi
@@ -14,8 +15,16 @@ from models import Event, PublishRequest, StatsResponse
 from database import (
     init_pool, close_pool, init_db, is_processed, mark_processed,
     get_events_by_topic, get_stats, get_topics, get_event_count,
-    increment_stats, clear_all_data
+    increment_stats, clear_all_data, mark_processed_batch,
+    add_pending_stats, flush_pending_stats, get_events_page, stream_events
 )
+from main import drain_batch, partition_for, encode_cursor, decode_cursor
+from dedup_filter import BloomFilter, DedupFilter
+from recent_cache import RecentKeyCache
+from statements import StatementRegistry
+import json_codec
+from spool import Spool
+from broker import RedisStreamBroker
 
 @pytest.fixture(scope="session")
 def event_loop():
@@ -400,6 +409,7 @@ async def test_event_with_large_payload():
     
     retrieved = await get_events_by_topic(event.topic)
     assert len(retrieved) == 1
+    assert retrieved[0]["payload"] == large_payload
 
 
 @pytest.mark.asyncio
@@ -416,5 +426,1354 @@ async def test_special_characters_in_fields():
     assert await is_processed(event.topic, event.event_id) is True
 
 
+@pytest.mark.asyncio
+async def test_batch_processed_counts_from_returning():
+    """T25: Batch commit menghitung unique/duplicate dari RETURNING"""
+    await mark_processed(create_event(event_id="evt-batch-0"))
+    
+    batch = [
+        create_event(event_id="evt-batch-0"),  # sudah ada di database
+        create_event(event_id="evt-batch-1"),
+        create_event(event_id="evt-batch-2"),
+        create_event(event_id="evt-batch-2"),  # duplikat di dalam batch
+    ]
+    unique, duplicate = await mark_processed_batch(batch)
+    
+    assert unique == 2
+    assert duplicate == 2
+    assert await get_event_count() == 3
+    
+    stats = await get_stats()
+    assert stats["unique_processed"] == 2
+    assert stats["duplicate_dropped"] == 2
+
+
+@pytest.mark.asyncio
+async def test_drain_batch_respects_size_and_linger():
+    """T26: drain_batch berhenti di max_size atau setelah linger habis"""
+    queue = asyncio.Queue()
+    for i in range(5):
+        queue.put_nowait(create_event(event_id=f"evt-drain-{i}"))
+    
+    batch = await drain_batch(queue, max_size=3, linger_ms=10)
+    assert [e.event_id for e in batch] == ["evt-drain-0", "evt-drain-1", "evt-drain-2"]
+    
+    batch = await drain_batch(queue, max_size=10, linger_ms=10)
+    assert len(batch) == 2
+
+
+@pytest.mark.asyncio
+async def test_partition_for_is_stable_per_topic():
+    """T27: Topic yang sama selalu ke worker yang sama (urutan per-topic terjaga)"""
+    topics = [f"logs.topic-{i}" for i in range(50)]
+    first = [partition_for(topic, 4) for topic in topics]
+    second = [partition_for(topic, 4) for topic in topics]
+    
+    assert first == second
+    assert all(0 <= p < 4 for p in first)
+    assert len(set(first)) > 1  # topic tersebar ke lebih dari satu worker
+
+
+@pytest.mark.asyncio
+async def test_batch_copy_path_above_threshold(monkeypatch):
+    """T28: Batch di atas threshold lewat COPY dengan hasil dedup yang sama"""
+    import database
+    monkeypatch.setattr(database, "COPY_THRESHOLD", 2)
+    
+    await mark_processed(create_event(event_id="evt-copy-0"))
+    batch = [create_event(event_id=f"evt-copy-{i}") for i in range(4)]
+    batch.append(create_event(event_id="evt-copy-3"))
+    
+    unique, duplicate = await mark_processed_batch(batch)
+    assert unique == 3
+    assert duplicate == 2
+    assert await get_event_count() == 4
+
+
+@pytest.mark.asyncio
+async def test_bloom_filter_no_false_negatives():
+    """T29: Bloom filter tidak pernah false negative dan FPR mendekati target"""
+    bloom = BloomFilter(capacity=10000, false_positive_rate=0.01)
+    for i in range(10000):
+        bloom.add("logs.test", f"evt-{i}")
+    
+    assert all(bloom.might_contain("logs.test", f"evt-{i}") for i in range(10000))
+    false_positives = sum(bloom.might_contain("logs.test", f"new-{i}") for i in range(10000))
+    assert false_positives / 10000 < 0.03
+
+
+@pytest.mark.asyncio
+async def test_dedup_filter_rotation_and_readiness():
+    """T30: DedupFilter konservatif sebelum ready dan tetap dalam memory budget saat rotasi"""
+    dedup_filter = DedupFilter(max_bytes=4096, false_positive_rate=0.01)
+    
+    # Belum warm-up: semua key dianggap mungkin sudah dilihat
+    assert dedup_filter.might_contain("logs.test", "evt-unknown") is True
+    dedup_filter.ready = True
+    assert dedup_filter.might_contain("logs.test", "evt-unknown") is False
+    
+    for i in range(20000):
+        dedup_filter.add("logs.test", f"evt-{i}")
+    
+    stats = dedup_filter.stats()
+    assert stats["rotations"] > 0
+    assert stats["memory_bytes"] <= 4096
+    assert dedup_filter.might_contain("logs.test", "evt-19999") is True
+    assert stats["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_recent_key_cache_lru_eviction():
+    """T31: Cache key terbaru membuang key paling lama (LRU) saat penuh"""
+    cache = RecentKeyCache(max_size=2)
+    cache.add_many([("t", "1"), ("t", "2")])
+    
+    assert cache.contains(("t", "1")) is True  # "1" jadi most recently used
+    cache.add_many([("t", "3")])
+    
+    assert cache.contains(("t", "2")) is False
+    assert cache.contains(("t", "1")) is True
+    assert cache.contains(("t", "3")) is True
+    
+    stats = cache.stats()
+    assert stats["size"] == 2
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 3
+    assert stats["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_recent_key_cache_ttl_expiry():
+    """T32: Key di cache kedaluwarsa setelah TTL"""
+    cache = RecentKeyCache(max_size=10, ttl_seconds=0.05)
+    cache.add_many([("t", "1")])
+    assert cache.contains(("t", "1")) is True
+    
+    await asyncio.sleep(0.1)
+    assert cache.contains(("t", "1")) is False
+    assert cache.stats()["expirations"] == 1
+    assert len(cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_sharded_stats_with_pending_flush():
+    """T33: Counter in-process terlihat di get_stats sebelum dan sesudah flush"""
+    await asyncio.gather(*[increment_stats(received=1) for _ in range(50)])
+    add_pending_stats(received=5, unique=3, duplicate=2)
+    
+    before = await get_stats()
+    assert before == {"received": 55, "unique_processed": 3, "duplicate_dropped": 2}
+    
+    await flush_pending_stats()
+    after = await get_stats()
+    assert after == before
+
+
+@pytest.mark.asyncio
+async def test_cursor_round_trip():
+    """T34: Cursor keyset (processed_at, id) bisa di-encode/decode, cursor rusak ditolak"""
+    key = (datetime(2025, 12, 18, 10, 30, 0, 123456), 42)
+    assert decode_cursor(encode_cursor(key)) == key
+    
+    with pytest.raises(ValueError):
+        decode_cursor("bukan-cursor")
+
+
+@pytest.mark.asyncio
+async def test_keyset_pagination_pages_through_all_events():
+    """T35: Keyset pagination mengembalikan semua event tanpa duplikasi antar halaman"""
+    await mark_processed_batch([create_event(topic="logs.page", event_id=f"evt-page-{i}") for i in range(7)])
+    
+    seen = []
+    after = None
+    while True:
+        page, after = await get_events_page("logs.page", limit=3, after=after)
+        seen.extend(e["event_id"] for e in page)
+        assert len(page) <= 3
+        if after is None:
+            break
+    
+    assert seen == [f"evt-page-{i}" for i in range(7)]
+
+
+@pytest.mark.asyncio
+async def test_stream_events_in_chunks():
+    """T36: stream_events mengembalikan semua event per chunk dan menghormati filter waktu"""
+    await mark_processed_batch([create_event(topic="logs.stream", event_id=f"evt-stream-{i}") for i in range(5)])
+    await mark_processed(create_event(topic="logs.other", event_id="evt-other"))
+    
+    chunks = [chunk async for chunk in stream_events("logs.stream", chunk_size=2)]
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert [e["event_id"] for chunk in chunks for e in chunk] == [f"evt-stream-{i}" for i in range(5)]
+    
+    future = datetime.utcnow().replace(year=datetime.utcnow().year + 1)
+    assert [chunk async for chunk in stream_events(since=future)] == []
+
+
+@pytest.mark.asyncio
+async def test_partition_naming_and_bounds(monkeypatch):
+    """T37: Nama, periode dan bound partisi processed_events"""
+    import database
+    
+    monkeypatch.setattr(database, "EVENTS_PARTITION_INTERVAL", "hourly")
+    start = database._partition_floor(datetime(2025, 12, 18, 10, 30, 15))
+    assert start == datetime(2025, 12, 18, 10)
+    assert database._partition_name(start) == "processed_events_p2025121810"
+    
+    monkeypatch.setattr(database, "EVENTS_PARTITION_INTERVAL", "daily")
+    assert database._partition_name(database._partition_floor(start)) == "processed_events_p20251218"
+    
+    assert database._parse_bound("MINVALUE") is None
+    assert database._parse_bound("'2025-12-18 00:00:00'") == datetime(2025, 12, 18)
+
+
+@pytest.mark.asyncio
+async def test_retention_reaper_deletes_expired_keys_in_batches(monkeypatch):
+    """T38: Reaper menghapus key dedup yang melewati window per batch"""
+    import database
+    monkeypatch.setattr(database, "DEDUP_WINDOW_HOURS", 1)
+    monkeypatch.setattr(database, "RETENTION_BATCH_SIZE", 2)
+    
+    await mark_processed_batch([create_event(event_id=f"evt-old-{i}") for i in range(5)])
+    await mark_processed(create_event(event_id="evt-fresh"))
+    async with database.get_connection() as conn:
+        await conn.execute(
+            "UPDATE dedup_store SET created_at = LOCALTIMESTAMP - INTERVAL '2 hours' WHERE event_id LIKE 'evt-old-%'"
+        )
+    
+    deleted = await database.reap_expired()
+    assert deleted["dedup_store"] == 5
+    assert await is_processed("test.topic", "evt-fresh") is True
+    assert await is_processed("test.topic", "evt-old-0") is False
+    
+    status = {s["table"]: s for s in await database.get_retention_status()}
+    assert status["dedup_store"]["lag_seconds"] == 0.0
+
+
+@pytest.mark.asyncio
+async def test_dedup_storage_events_mode(monkeypatch):
+    """T39: DEDUP_STORAGE=events men-dedup lewat processed_events tanpa menulis dedup_store"""
+    import database
+    monkeypatch.setattr(database, "DEDUP_STORAGE", "events")
+    
+    success, _ = await mark_processed(create_event(event_id="evt-ev-0"))
+    assert success is True
+    success, error = await mark_processed(create_event(event_id="evt-ev-0"))
+    assert success is False
+    assert "Duplicate" in error
+    
+    batch = [create_event(event_id=f"evt-ev-{i}") for i in range(3)]
+    batch.append(create_event(event_id="evt-ev-2"))
+    unique, duplicate = await mark_processed_batch(batch)
+    assert unique == 2
+    assert duplicate == 2
+    
+    assert await is_processed("test.topic", "evt-ev-1") is True
+    assert await get_event_count() == 3
+    async with database.get_connection() as conn:
+        assert await conn.fetchval("SELECT COUNT(*) FROM dedup_store") == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("isolation", ["read_committed", "serializable"])
+async def test_concurrent_overlapping_batches_exact_counts(monkeypatch, isolation):
+    """T40: Stress batch + single concurrent dengan key overlap; unique/duplicate tetap exact"""
+    import database
+    for name in ("ISOLATION_MARK_PROCESSED", "ISOLATION_BATCH", "ISOLATION_STATS"):
+        monkeypatch.setattr(database, name, isolation)
+    
+    key_space = 200
+    batches = [
+        [create_event(event_id=f"evt-stress-{(w * 37 + i) % key_space}") for i in range(100)]
+        for w in range(16)
+    ]
+    singles = [create_event(event_id=f"evt-stress-{i}") for i in range(0, key_space, 5)]
+    
+    results = await asyncio.gather(
+        *(mark_processed_batch(batch) for batch in batches),
+        *(mark_processed(event) for event in singles)
+    )
+    batch_results, single_results = results[:len(batches)], results[len(batches):]
+    
+    batch_unique = sum(unique for unique, _ in batch_results)
+    single_unique = sum(1 for success, _ in single_results if success)
+    distinct = len({e.event_id for batch in batches for e in batch} | {e.event_id for e in singles})
+    
+    assert batch_unique + single_unique == distinct
+    assert await get_event_count() == distinct
+    stats = await get_stats()
+    assert stats["unique_processed"] == batch_unique
+    assert stats["duplicate_dropped"] == sum(len(b) for b in batches) - batch_unique
+
+
+@pytest.mark.asyncio
+async def test_isolation_from_env_rejects_unknown_level(monkeypatch):
+    """T41: Isolation level dari env divalidasi"""
+    import database
+    monkeypatch.setenv("DB_ISOLATION_TEST", "READ_COMMITTED")
+    assert database._isolation_from_env("DB_ISOLATION_TEST", "serializable") == "read_committed"
+    monkeypatch.setenv("DB_ISOLATION_TEST", "snapshot")
+    with pytest.raises(ValueError):
+        database._isolation_from_env("DB_ISOLATION_TEST", "serializable")
+
+
+class _FakeConnection:
+    def __init__(self, missing_tables=()):
+        self.missing_tables = set(missing_tables)
+        self.prepared = []
+        self.executed = []
+
+    async def _get_statement(self, sql, timeout):
+        if any(table in sql for table in self.missing_tables):
+            raise asyncpg.UndefinedTableError("relation does not exist")
+        self.prepared.append(sql)
+
+    async def execute(self, sql):
+        self.executed.append(sql)
+
+    async def fetchval(self, sql, *args):
+        assert sql in self.prepared
+        return args[0]
+
+
+@pytest.mark.asyncio
+async def test_statement_registry_prepares_and_records_latency():
+    """T42: Registry prepare per connection, prepare lazily tabel yang belum ada, catat eksekusi"""
+    registry = StatementRegistry()
+    registry.register("ready", "SELECT $1 FROM ready_table")
+    registry.register("later", "SELECT $1 FROM missing_table")
+    with pytest.raises(ValueError):
+        registry.register("ready", "SELECT 1")
+    
+    conn = _FakeConnection(missing_tables=["missing_table"])
+    await registry.prepare_all(conn)
+    assert conn.prepared_statements == {"ready"}
+    # Transaksi implisit dari prepare ditutup sebelum connection masuk pool
+    assert conn.executed == ["SELECT 1"]
+    
+    conn.missing_tables.clear()
+    assert await registry.run(conn, "ready", "fetchval", 7) == 7
+    assert await registry.run(conn, "later", "fetchval", 8) == 8
+    assert await registry.run(conn, "later", "fetchval", 9) == 9
+    
+    stats = registry.stats()
+    assert stats["ready"]["calls"] == 1
+    assert stats["later"]["calls"] == 2
+    assert stats["later"]["prepares"] == 1
+    assert stats["later"]["max_ms"] >= stats["later"]["p50_ms"] >= 0
+
+
+@pytest.mark.asyncio
+async def test_jsonb_codec_round_trip():
+    """T43: Codec JSONB binary encode/decode payload tanpa kehilangan data"""
+    payload = {"message": "héllo ✓", "nested": {"items": [1, 2.5, None, True]}, "empty": {}}
+    encoded = json_codec._encode_jsonb(payload)
+    assert encoded[:1] == b"\x01"
+    assert json_codec._decode_jsonb(encoded) == payload
+    assert json_codec.loads(json_codec.dumps(payload)) == payload
+    with pytest.raises(ValueError):
+        json_codec._decode_jsonb(b"\x02{}")
+
+
+@pytest.mark.asyncio
+async def test_spool_replays_unacked_events_after_restart(tmp_path):
+    """T44: Event yang belum di-ack di-replay setelah restart; segment habis dihapus"""
+    spool = Spool(str(tmp_path), segment_bytes=64, group_commit_ms=1)
+    assert spool.open() == []
+    
+    lsns = await spool.append([f"event-{i}".encode() for i in range(6)])
+    assert lsns == [1, 2, 3, 4, 5, 6]
+    more = await asyncio.gather(spool.append([b"event-6"]), spool.append([b"event-7"]))
+    assert sorted(lsn for group in more for lsn in group) == [7, 8]
+    
+    # Ack di luar urutan: checkpoint hanya maju sampai LSN yang semua di bawahnya sudah di-ack
+    spool.ack([1, 2, 4])
+    assert spool.stats()["checkpoint"] == 2
+    spool.ack([3])
+    assert spool.stats()["checkpoint"] == 4
+    await spool.close()
+    assert spool.stats()["segments"] >= 2
+    
+    reopened = Spool(str(tmp_path), segment_bytes=64, group_commit_ms=1)
+    pending = reopened.open()
+    assert [lsn for lsn, _ in pending] == [5, 6, 7, 8]
+    assert pending[0][1] == b"event-4"
+    assert (await reopened.append([b"event-8"])) == [9]
+    
+    reopened.ack([5, 6, 7, 8, 9])
+    await reopened.close()
+    assert Spool(str(tmp_path)).open() == []
+
+
+@pytest.mark.asyncio
+async def test_spool_drops_torn_tail(tmp_path):
+    """T45: Record terakhir yang terpotong (crash saat write) dibuang saat replay"""
+    spool = Spool(str(tmp_path), group_commit_ms=0)
+    spool.open()
+    await spool.append([b"complete", b"torn-record"])
+    await spool.close()
+    
+    segment = sorted(tmp_path.glob("segment-*.log"))[-1]
+    segment.write_bytes(segment.read_bytes()[:-4])
+    
+    pending = Spool(str(tmp_path)).open()
+    assert pending == [(1, b"complete")]
+
+
+@pytest.mark.asyncio
+async def test_redis_stream_broker_ack_and_reclaim():
+    """T46: Redis Streams: XADD pipeline, XREADGROUP per batch, XACK, XAUTOCLAIM entry stalled"""
+    fakeredis = pytest.importorskip("fakeredis")
+    broker = RedisStreamBroker(
+        fakeredis.FakeAsyncRedis(), "test:ingest", "test-group",
+        reclaim_idle_ms=20, reclaim_interval_ms=0
+    )
+    await broker.ensure_group()
+    await broker.ensure_group()  # idempotent (BUSYGROUP)
+    
+    events = [create_event(event_id=f"evt-stream-{i}") for i in range(5)]
+    assert len(await broker.publish(events)) == 5
+    
+    # Consumer A membaca 3 entry lalu "mati" tanpa ack
+    stalled = await broker.read("replica-a", count=3, block_ms=10)
+    assert [e.event_id for _, e in stalled] == ["evt-stream-0", "evt-stream-1", "evt-stream-2"]
+    
+    # Consumer B: entry belum idle cukup lama, jadi ambil entry baru
+    fresh = await broker.read("replica-b", count=10, block_ms=10)
+    assert [e.event_id for _, e in fresh] == ["evt-stream-3", "evt-stream-4"]
+    await broker.ack([entry_id for entry_id, _ in fresh])
+    
+    await asyncio.sleep(0.05)
+    reclaimed = await broker.read("replica-b", count=10, block_ms=10)
+    assert [e.event_id for _, e in reclaimed] == ["evt-stream-0", "evt-stream-1", "evt-stream-2"]
+    await broker.ack([entry_id for entry_id, _ in reclaimed])
+    
+    stats = await broker.stats()
+    assert stats["pending"] == 0
+    assert stats["length"] == 0
+    assert stats["acked"] == 5
+    assert stats["reclaimed"] == 3
+    await broker.close()
+
+
+@pytest.mark.asyncio
+async def test_publish_sheds_load_above_high_water_mark(monkeypatch):
+    """T47: /publish tidak menunggu queue penuh: partial 200 lalu 429 dengan Retry-After"""
+    import httpx
+    import main
+    monkeypatch.setattr(main, "_queues", [asyncio.Queue(maxsize=10)])
+    monkeypatch.setattr(main, "_reserved", [0])
+    monkeypatch.setattr(main, "QUEUE_HIGH_WATER_MARK", 0.8)
+    
+    events = [create_event(event_id=f"evt-bp-{i}").dict() for i in range(10)]
+    async with httpx.AsyncClient(app=main.app, base_url="http://test") as client:
+        resp = await client.post("/publish", json={"events": events})
+        assert resp.status_code == 200
+        body = resp.json()
+        assert body["status"] == "partial"
+        assert body["accepted"] == 8
+        assert [e["index"] for e in body["errors"]] == [8, 9]
+        assert all(e["retryable"] for e in body["errors"])
+        assert resp.headers["Retry-After"] == str(main.PUBLISH_RETRY_AFTER_S)
+        
+        resp = await client.post("/publish", json={"events": events[8:]})
+        assert resp.status_code == 429
+        assert resp.json()["accepted"] == 0
+        assert "Retry-After" in resp.headers
+    
+    assert main._queues[0].qsize() == 8
+    assert main._reserved == [0]
+
+
+@pytest.mark.asyncio
+async def test_reuseport_sockets_share_port():
+    """T48: Beberapa proses aggregator bisa listen di port yang sama (SO_REUSEPORT)"""
+    import socket
+    from server import reuseport_socket
+    if not hasattr(socket, "SO_REUSEPORT"):
+        pytest.skip("SO_REUSEPORT not supported")
+    
+    first = reuseport_socket("127.0.0.1", 0)
+    port = first.getsockname()[1]
+    second = reuseport_socket("127.0.0.1", port)
+    try:
+        first.listen()
+        second.listen()
+        assert second.getsockname()[1] == port
+    finally:
+        first.close()
+        second.close()
+
+
+@pytest.mark.asyncio
+async def test_stats_cache_single_flight(monkeypatch):
+    """T49: /stats cache: query database sekali per TTL walau request concurrent"""
+    import main
+    calls = {"stats": 0, "topics": 0}
+    
+    async def fake_stats():
+        calls["stats"] += 1
+        await asyncio.sleep(0.01)
+        return {"received": 1, "unique_processed": 1, "duplicate_dropped": 0}
+    
+    async def fake_topics():
+        calls["topics"] += 1
+        return ["topic.a"]
+    
+    monkeypatch.setattr(main, "get_stats", fake_stats)
+    monkeypatch.setattr(main, "get_topics", fake_topics)
+    monkeypatch.setattr(main, "STATS_CACHE_TTL_MS", 60000)
+    main.invalidate_stats_cache()
+    
+    results = await asyncio.gather(*[main.cached_db_stats() for _ in range(10)])
+    assert all(result == results[0] for result in results)
+    assert calls == {"stats": 1, "topics": 1}
+    
+    main.invalidate_stats_cache()
+    await main.cached_db_stats()
+    assert calls == {"stats": 2, "topics": 2}
+    main.invalidate_stats_cache()
+
+
+@pytest.mark.asyncio
+async def test_topics_catalog_maintained_on_insert():
+    """T50: Katalog topics terisi dari insert single dan batch"""
+    await mark_processed(create_event(topic="catalog.single", event_id="evt-cat-1"))
+    await mark_processed_batch([
+        create_event(topic="catalog.batch", event_id="evt-cat-2"),
+        create_event(topic="catalog.batch", event_id="evt-cat-3"),
+    ])
+    
+    topics = await get_topics()
+    assert "catalog.single" in topics
+    assert "catalog.batch" in topics
+    assert topics == sorted(topics)
+
+
+@pytest.mark.asyncio
+async def test_publish_batch_endpoint_validates_per_event(monkeypatch):
+    """T51: /publish/batch menerima event valid dan melaporkan yang invalid per index"""
+    import httpx
+    import main
+    monkeypatch.setattr(main, "_queues", [asyncio.Queue(maxsize=100)])
+    monkeypatch.setattr(main, "_reserved", [0])
+    
+    events = [create_event(event_id=f"evt-fast-{i}").dict() for i in range(3)]
+    invalid = {"topic": "", "event_id": "evt-fast-bad", "source": "test"}
+    async with httpx.AsyncClient(app=main.app, base_url="http://test") as client:
+        resp = await client.post("/publish/batch", content=json.dumps(events))
+        assert resp.status_code == 200
+        assert resp.json()["accepted"] == 3
+        
+        resp = await client.post("/publish/batch", content=json.dumps(events[:1] + [invalid, 42]))
+        body = resp.json()
+        assert body["status"] == "accepted"
+        assert (body["count"], body["accepted"], body["rejected"]) == (3, 1, 2)
+        assert [e["index"] for e in body["errors"]] == [1, 2]
+        assert body["errors"][0]["event_id"] == "evt-fast-bad"
+        assert not any(e["retryable"] for e in body["errors"])
+        
+        resp = await client.post("/publish/batch", content=json.dumps({"events": events}))
+        assert resp.status_code == 400
+        resp = await client.post("/publish/batch", content=b"not json")
+        assert resp.status_code == 400
+    
+    assert main._queues[0].qsize() == 4
+
+
+@pytest.mark.asyncio
+async def test_ndjson_decoder_incremental():
+    """T52: NDJSON decoder: baris terpotong antar chunk, gzip/zstd, baris terlalu panjang"""
+    import gzip
+    from ndjson import NDJSONDecoder, zstandard
+    
+    body = b'{"a": 1}\n\n' + b'{"b": "' + b"x" * 100 + b'"}\n{"c": 3}'
+    encodings = {"identity": body, "gzip": gzip.compress(body)}
+    if zstandard is not None:
+        encodings["zstd"] = zstandard.ZstdCompressor().compress(body)
+    
+    for encoding, data in encodings.items():
+        decoder = NDJSONDecoder(encoding, max_line_bytes=64)
+        lines = []
+        for i in range(0, len(data), 7):
+            lines.extend(decoder.feed(data[i:i + 7]))
+        lines.extend(decoder.close())
+        assert lines == [(0, b'{"a": 1}'), (2, None), (3, b'{"c": 3}')], encoding
+    
+    with pytest.raises(ValueError):
+        NDJSONDecoder("br")
+    decoder = NDJSONDecoder("gzip")
+    with pytest.raises(ValueError):
+        list(decoder.feed(b"not gzip data"))
+
+
+def _decode_all(decoder, data: bytes, chunk_size: int = 7):
+    lines = []
+    for i in range(0, len(data), chunk_size):
+        lines.extend(decoder.feed(data[i:i + chunk_size]))
+    lines.extend(decoder.close())
+    return lines
+
+
+@pytest.mark.asyncio
+async def test_ndjson_decoder_multi_member_and_truncated():
+    """T58: gzip multi-member dan zstd multi-frame dibaca penuh; body terpotong ValueError"""
+    import gzip
+    from ndjson import NDJSONDecoder, zstandard
+    
+    first, second = b'{"a": 1}\n{"b": 2}\n', b'{"c": 3}\n{"d": 4}'
+    expected = [(0, b'{"a": 1}'), (1, b'{"b": 2}'), (2, b'{"c": 3}'), (3, b'{"d": 4}')]
+    bodies = {"gzip": gzip.compress(first) + gzip.compress(second)}
+    if zstandard is not None:
+        compressor = zstandard.ZstdCompressor()
+        bodies["zstd"] = compressor.compress(first) + compressor.compress(second)
+    
+    for encoding, data in bodies.items():
+        for chunk_size in (3, 7, len(data)):
+            assert _decode_all(NDJSONDecoder(encoding), data, chunk_size) == expected, (encoding, chunk_size)
+        with pytest.raises(ValueError):
+            _decode_all(NDJSONDecoder(encoding), data[:-4])
+    
+    assert _decode_all(NDJSONDecoder("gzip"), b"") == []
+
+
+@pytest.mark.asyncio
+async def test_ndjson_decoder_bounds_decompression_steps():
+    """T59: Compression bomb di-dekompresi bertahap, tidak sekaligus dalam satu feed"""
+    import gzip
+    from ndjson import NDJSONDecoder, zstandard
+    
+    raw = b'{"a": 1}\n' * 2_000_000
+    bodies = {"gzip": gzip.compress(raw)}
+    if zstandard is not None:
+        bodies["zstd"] = zstandard.ZstdCompressor().compress(raw)
+    
+    for encoding, data in bodies.items():
+        decoder = NDJSONDecoder(encoding)
+        lines = decoder.feed(data)
+        assert next(lines) == (0, b'{"a": 1}')
+        # Generator baru melewati satu langkah dekompresi
+        assert decoder.bytes_out < 8 * 1024 * 1024, encoding
+        assert sum(1 for _ in lines) + 1 + sum(1 for _ in decoder.close()) == 2_000_000
+
+
+@pytest.mark.asyncio
+async def test_publish_stream_endpoint(monkeypatch):
+    """T53: /publish/stream meng-enqueue NDJSON gzip per batch dengan error per baris"""
+    import gzip
+    import httpx
+    import main
+    monkeypatch.setattr(main, "_queues", [asyncio.Queue(maxsize=100)])
+    monkeypatch.setattr(main, "_reserved", [0])
+    monkeypatch.setattr(main, "PUBLISH_STREAM_BATCH_SIZE", 2)
+    
+    lines = [json.dumps(create_event(event_id=f"evt-nd-{i}").dict()) for i in range(5)]
+    lines.insert(2, '{"topic": "", "source": "test"}')
+    lines.insert(4, "{not json")
+    body = gzip.compress(("\n".join(lines) + "\n").encode("utf-8"))
+    
+    async with httpx.AsyncClient(app=main.app, base_url="http://test") as client:
+        resp = await client.post(
+            "/publish/stream", content=body,
+            headers={"Content-Type": "application/x-ndjson", "Content-Encoding": "gzip"}
+        )
+        assert resp.status_code == 200
+        result = resp.json()
+        assert (result["count"], result["accepted"], result["rejected"]) == (7, 5, 2)
+        assert [e["index"] for e in result["errors"]] == [2, 4]
+        
+        resp = await client.post("/publish/stream", content=b"", headers={"Content-Encoding": "br"})
+        assert resp.status_code == 415
+        
+        resp = await client.post(
+            "/publish/stream", content=body[:-4],
+            headers={"Content-Type": "application/x-ndjson", "Content-Encoding": "gzip"}
+        )
+        assert resp.status_code == 400
+        assert resp.json()["accepted"] == 5
+    
+    assert main._queues[0].qsize() == 10
+    assert main._reserved == [0]
+
+
+@pytest.mark.asyncio
+async def test_msgpack_ingest_and_accept_negotiation(monkeypatch):
+    """T54: /publish menerima msgpack dan /events menjawab msgpack jika diminta Accept"""
+    import httpx
+    import msgpack
+    import main
+    from msgpack_codec import accepts_msgpack
+    
+    assert accepts_msgpack("application/msgpack")
+    assert accepts_msgpack("application/json, application/msgpack")
+    assert not accepts_msgpack("application/json, application/msgpack;q=0.5")
+    assert not accepts_msgpack("*/*")
+    assert not accepts_msgpack(None)
+    
+    monkeypatch.setattr(main, "_queues", [asyncio.Queue(maxsize=100)])
+    monkeypatch.setattr(main, "_reserved", [0])
+    page = [dict(create_event(event_id=f"evt-mp-{i}").dict(), processed_at="2025-12-18T10:30:00") for i in range(2)]
+    
+    async def fake_events_page(*args, **kwargs):
+        return page, None
+    
+    monkeypatch.setattr(main, "get_events_page", fake_events_page)
+    
+    events = [create_event(event_id=f"evt-mp-{i}").dict() for i in range(3)]
+    async with httpx.AsyncClient(app=main.app, base_url="http://test") as client:
+        resp = await client.post(
+            "/publish", content=msgpack.packb({"events": events}),
+            headers={"Content-Type": "application/msgpack"}
+        )
+        assert resp.status_code == 200
+        assert resp.json()["accepted"] == 3
+        
+        resp = await client.post(
+            "/publish", content=msgpack.packb({"events": [{"topic": "x"}]}),
+            headers={"Content-Type": "application/msgpack"}
+        )
+        assert resp.status_code == 422
+        
+        resp = await client.get("/events", headers={"Accept": "application/msgpack"})
+        assert resp.headers["content-type"] == "application/msgpack"
+        assert msgpack.unpackb(resp.content) == [
+            {key: value for key, value in event.items() if key != "processed_at"} for event in page
+        ]
+        
+        resp = await client.get("/events")
+        assert resp.headers["content-type"] == "application/json"
+        assert resp.json() == msgpack.unpackb(
+            (await client.get("/events", headers={"Accept": "application/msgpack"})).content
+        )
+    
+    assert main._queues[0].qsize() == 3
+
+
+@pytest.mark.asyncio
+async def test_read_endpoints_preserialized_match_response_model(monkeypatch):
+    """T55: /events dan /stats di-serialize langsung tapi tetap sesuai response_model"""
+    import time
+    import httpx
+    import main
+    from models import EventResponse
+    
+    page = [dict(create_event(event_id=f"evt-ro-{i}").dict(), processed_at="2025-12-18T10:30:00") for i in range(3)]
+    
+    async def fake_events_page(*args, **kwargs):
+        return page, None
+    
+    async def fake_db_stats():
+        return {"received": 10, "unique_processed": 7, "duplicate_dropped": 3}, ["topic.a"]
+    
+    monkeypatch.setattr(main, "get_events_page", fake_events_page)
+    monkeypatch.setattr(main, "cached_db_stats", fake_db_stats)
+    monkeypatch.setattr(main, "_startup_time", time.time())
+    
+    async with httpx.AsyncClient(app=main.app, base_url="http://test") as client:
+        resp = await client.get("/events")
+        assert resp.headers["content-type"] == "application/json"
+        assert resp.json() == [EventResponse(**event).model_dump() for event in page]
+        
+        resp = await client.get("/stats")
+        assert resp.status_code == 200
+        stats = StatsResponse.model_validate(resp.json())
+        assert (stats.received, stats.unique_rate, stats.topics) == (10, 70.0, ["topic.a"])
+        assert set(resp.json()) == set(StatsResponse.model_fields)
+
+
+@pytest.mark.asyncio
+async def test_events_page_json_built_by_postgres():
+    """T56: Halaman JSON dari PostgreSQL sama dengan jalur Record -> dict, termasuk cursor"""
+    from main import _EVENT_RESPONSE_FIELDS
+    from database import get_events_page_json
+    
+    await mark_processed_batch([
+        create_event(topic="pgjson.topic", event_id=f"evt-pgjson-{i}") for i in range(5)
+    ])
+    
+    events, next_key = await get_events_page("pgjson.topic", 3)
+    body, json_next_key = await get_events_page_json("pgjson.topic", 3)
+    assert isinstance(body, bytes)
+    assert json.loads(body) == [{field: event[field] for field in _EVENT_RESPONSE_FIELDS} for event in events]
+    assert json_next_key == next_key
+    
+    body, json_next_key = await get_events_page_json("pgjson.topic", 3, after=next_key)
+    assert [event["event_id"] for event in json.loads(body)] == ["evt-pgjson-3", "evt-pgjson-4"]
+    assert json_next_key is None
+    
+    body, _ = await get_events_page_json("pgjson.missing", 3)
+    assert json.loads(body) == []
+
+
+@pytest.mark.asyncio
+async def test_events_endpoint_postgres_json_source(monkeypatch):
+    """T57: EVENTS_JSON_SOURCE=postgres meneruskan body dari database apa adanya"""
+    from datetime import datetime
+    import httpx
+    import main
+    
+    body = b'[{"topic":"a","event_id":"1","timestamp":"t","source":"s","payload":{}}]'
+    next_key = (datetime(2025, 12, 18, 10, 30), 42)
+    
+    async def fake_events_page_json(*args, **kwargs):
+        return body, next_key
+    
+    monkeypatch.setattr(main, "EVENTS_JSON_SOURCE", "postgres")
+    monkeypatch.setattr(main, "get_events_page_json", fake_events_page_json)
+    
+    async with httpx.AsyncClient(app=main.app, base_url="http://test") as client:
+        resp = await client.get("/events?limit=1")
+        assert resp.status_code == 200
+        assert resp.content == body
+        assert resp.headers["content-type"] == "application/json"
+        assert decode_cursor(resp.headers["X-Next-Cursor"]) == next_key
+
+
+def _fresh_worker_stats():
+    return {"processed": 0, "unique_processed": 0, "duplicate_dropped": 0, "batches": 0, "errors": 0, "dead_lettered": 0, "started_at": 0}
+
+
+@pytest.mark.asyncio
+async def test_single_consumer_remembers_only_stored_events(monkeypatch):
+    """T60: Event yang gagal disimpan (bukan duplikat) tidak masuk cache key terbaru"""
+    import main
+    from database import DUPLICATE_EVENT
+    
+    results = {
+        "evt-fail": (False, "connection refused"),
+        "evt-dup": (False, DUPLICATE_EVENT),
+        "evt-ok": (True, None),
+    }
+    
+    async def fake_mark_processed(event):
+        return results[event.event_id]
+    
+    async def fake_is_processed(topic, event_id):
+        return False
+    
+    async def fake_dead_letter_events(failures):
+        dead_lettered.extend(event.event_id for event, _ in failures)
+        return len(failures)
+    
+    acked = []
+    dead_lettered = []
+    cache = RecentKeyCache(max_size=10)
+    monkeypatch.setattr(main, "mark_processed", fake_mark_processed)
+    monkeypatch.setattr(main, "is_processed", fake_is_processed)
+    monkeypatch.setattr(main, "dead_letter_events", fake_dead_letter_events)
+    monkeypatch.setattr(main, "CONSUMER_COMMIT_RETRIES", 0)
+    monkeypatch.setattr(main, "_ack_spool", lambda lsns: acked.extend(lsns))
+    monkeypatch.setattr(main, "_recent_keys", cache)
+    monkeypatch.setattr(main, "_dedup_filter", None)
+    monkeypatch.setattr(main, "_worker_stats", [_fresh_worker_stats()])
+    
+    queue = asyncio.Queue()
+    for lsn, event_id in enumerate(results, start=1):
+        queue.put_nowait((lsn, create_event(event_id=event_id)))
+    worker = asyncio.create_task(main.consumer_worker(0, queue))
+    await asyncio.wait_for(queue.join(), 5)
+    worker.cancel()
+    
+    assert not cache.contains(("test.topic", "evt-fail"))
+    assert cache.contains(("test.topic", "evt-dup"))
+    assert cache.contains(("test.topic", "evt-ok"))
+    # Error non-transient tanpa retry tersisa: di-dead-letter lalu di-ack
+    assert dead_lettered == ["evt-fail"]
+    assert acked == [1, 2, 3]
+    assert main._worker_stats[0]["errors"] == 1
+    assert main._worker_stats[0]["duplicate_dropped"] == 1
+
+
+@pytest.mark.asyncio
+async def test_batch_consumer_dead_letters_only_bad_event(monkeypatch):
+    """T61: Satu event yang ditolak database tidak membuang batch; hanya event itu yang di-dead-letter"""
+    import main
+    
+    committed = []
+    dead_lettered = []
+    
+    async def fake_mark_processed_batch(events, skipped_duplicates=0):
+        if any("\x00" in event.payload["data"] for event in events):
+            raise asyncpg.exceptions.UntranslatableCharacterError("unsupported Unicode escape sequence")
+        committed.extend(event.event_id for event in events)
+        return len(events), skipped_duplicates
+    
+    async def fake_dead_letter_events(failures):
+        dead_lettered.extend(event.event_id for event, _ in failures)
+        return len(failures)
+    
+    acked = []
+    monkeypatch.setattr(main, "mark_processed_batch", fake_mark_processed_batch)
+    monkeypatch.setattr(main, "dead_letter_events", fake_dead_letter_events)
+    monkeypatch.setattr(main, "_ack_spool", lambda lsns: acked.extend(lsns))
+    monkeypatch.setattr(main, "_recent_keys", RecentKeyCache(max_size=100))
+    monkeypatch.setattr(main, "_dedup_filter", None)
+    monkeypatch.setattr(main, "_worker_stats", [_fresh_worker_stats()])
+    monkeypatch.setattr(main, "CONSUMER_BATCH_LINGER_MS", 0)
+    
+    queue = asyncio.Queue()
+    for lsn in range(1, 11):
+        data = "bad\x00" if lsn == 7 else "ok"
+        queue.put_nowait((lsn, create_event(event_id=f"evt-{lsn}", payload={"data": data})))
+    worker = asyncio.create_task(main.batch_consumer_worker(0, queue))
+    await asyncio.wait_for(queue.join(), 5)
+    worker.cancel()
+    
+    assert dead_lettered == ["evt-7"]
+    assert sorted(committed) == sorted(f"evt-{lsn}" for lsn in range(1, 11) if lsn != 7)
+    assert sorted(acked) == list(range(1, 11))
+    assert main._worker_stats[0]["dead_lettered"] == 1
+    assert main._worker_stats[0]["processed"] == 10
+
+
+@pytest.mark.asyncio
+async def test_batch_consumer_retries_failed_commit_and_advances_checkpoint(monkeypatch, tmp_path):
+    """T62: Commit batch yang gagal (koneksi putus) diulang dengan backoff; setelah berhasil checkpoint spool maju"""
+    import main
+    
+    attempts = []
+    
+    async def flaky_mark_processed_batch(events, skipped_duplicates=0):
+        attempts.append(len(events))
+        if len(attempts) <= 2:
+            raise asyncpg.exceptions.ConnectionDoesNotExistError("connection was closed in the middle of operation")
+        return len(events), skipped_duplicates
+    
+    spool = Spool(str(tmp_path), group_commit_ms=0)
+    spool.open()
+    monkeypatch.setattr(main, "_spool", spool)
+    monkeypatch.setattr(main, "mark_processed_batch", flaky_mark_processed_batch)
+    monkeypatch.setattr(main, "_recent_keys", RecentKeyCache(max_size=100))
+    monkeypatch.setattr(main, "_dedup_filter", None)
+    monkeypatch.setattr(main, "_worker_stats", [_fresh_worker_stats()])
+    monkeypatch.setattr(main, "CONSUMER_BATCH_LINGER_MS", 0)
+    monkeypatch.setattr(main, "CONSUMER_COMMIT_RETRIES", 0)
+    monkeypatch.setattr(main, "CONSUMER_RETRY_BACKOFF_BASE_S", 0.001)
+    
+    events = [create_event(event_id=f"evt-{i}") for i in range(5)]
+    lsns = await spool.append([json_codec.dumps_bytes(event.dict()) for event in events])
+    queue = asyncio.Queue()
+    for lsn, event in zip(lsns, events):
+        queue.put_nowait((lsn, event))
+    worker = asyncio.create_task(main.batch_consumer_worker(0, queue))
+    await asyncio.wait_for(queue.join(), 5)
+    worker.cancel()
+    
+    # Error transient tidak di-dead-letter walau melewati CONSUMER_COMMIT_RETRIES
+    assert attempts == [5, 5, 5]
+    assert main._worker_stats[0]["errors"] == 2
+    assert main._worker_stats[0]["dead_lettered"] == 0
+    assert spool.stats()["checkpoint"] == lsns[-1]
+    await spool.close()
+
+
+@pytest.mark.asyncio
+async def test_spool_failed_fsync_does_not_block_checkpoint(monkeypatch, tmp_path):
+    """T63: LSN yang fsync-nya gagal dilepas dari in-flight sehingga checkpoint tetap maju"""
+    import spool as spool_module
+    
+    spool = Spool(str(tmp_path), group_commit_ms=0)
+    spool.open()
+    real_fsync = spool_module.os.fsync
+    
+    def failing_fsync(fd):
+        raise OSError("disk error")
+    
+    monkeypatch.setattr(spool_module.os, "fsync", failing_fsync)
+    with pytest.raises(OSError):
+        await spool.append([b"lost-1", b"lost-2"])
+    monkeypatch.setattr(spool_module.os, "fsync", real_fsync)
+    
+    lsns = await spool.append([b"event-3"])
+    assert lsns == [3]
+    spool.ack(lsns)
+    assert spool.stats()["checkpoint"] == 3
+    assert spool.stats()["unacked"] == 0
+    await spool.close()
+
+
+@pytest.mark.asyncio
+async def test_json_codec_encodes_integers_beyond_64_bits():
+    """T64: Integer di luar 64-bit tetap di-encode (fallback json), termasuk ke jsonb"""
+    payload = {"big": 2 ** 70, "negative": -(2 ** 64), "text": "é", "nested": [1, {"n": 10 ** 30}]}
+    expected = '{"big":1180591620717411303424,"negative":-18446744073709551616,"text":"é","nested":[1,{"n":1000000000000000000000000000000}]}'
+    
+    assert json_codec.dumps(payload) == expected
+    assert json_codec._encode_jsonb(payload) == b"\x01" + expected.encode("utf-8")
+    assert json.loads(json_codec.dumps_bytes(payload)) == payload
+    
+    # Value yang memang tidak bisa di-encode tetap TypeError
+    with pytest.raises(TypeError):
+        json_codec.dumps_bytes({"obj": object()})
+
+
+@pytest.mark.asyncio
+async def test_publish_keeps_integers_beyond_64_bits(monkeypatch):
+    """T65: Integer di luar 64-bit sampai ke queue tanpa berubah menjadi float"""
+    import httpx
+    import main
+    
+    big = 2 ** 70
+    assert json_codec.loads(f'{{"n": {big}, "m": -{2 ** 63 + 1}, "f": 1.5}}') == {"n": big, "m": -(2 ** 63 + 1), "f": 1.5}
+    assert json_codec.loads(memoryview(b'{"s": "12345678901234567890"}')) == {"s": "12345678901234567890"}
+    assert json_codec.loads("1" * 400) == int("1" * 400)
+    assert json_codec.loads(b'{"f": 1e20}') == {"f": 1e20}
+    for invalid in (f"[NaN, {big}]", "1e400"):
+        with pytest.raises(ValueError):
+            json_codec.loads(invalid)
+    
+    monkeypatch.setattr(main, "_queues", [asyncio.Queue(maxsize=100)])
+    monkeypatch.setattr(main, "_reserved", [0])
+    event = create_event(event_id="evt-big", payload={"amount": big}).dict()
+    body = json.dumps(event)
+    async with httpx.AsyncClient(app=main.app, base_url="http://test") as client:
+        resp = await client.post("/publish", content=f'{{"events": [{body}]}}')
+        assert resp.status_code == 200
+        resp = await client.post("/publish/batch", content=f"[{body}]")
+        assert resp.status_code == 200
+        resp = await client.post(
+            "/publish/stream", content=body + "\n", headers={"Content-Type": "application/x-ndjson"}
+        )
+        assert resp.status_code == 200
+    
+    queued = [main._queues[0].get_nowait()[1] for _ in range(3)]
+    assert [e.payload["amount"] for e in queued] == [big] * 3
+    assert all(type(e.payload["amount"]) is int for e in queued)
+
+
+@pytest.mark.asyncio
+async def test_events_stream_error_does_not_end_cleanly(monkeypatch):
+    """T66: Error di tengah export /events/stream memutus response, tidak berakhir sebagai 200 normal"""
+    import httpx
+    import main
+    
+    async def failing_stream_events(topic, **kwargs):
+        yield [create_event(event_id="evt-export-1").dict()]
+        raise asyncpg.exceptions.ConnectionDoesNotExistError("connection was closed in the middle of operation")
+    
+    monkeypatch.setattr(main, "stream_events", failing_stream_events)
+    async with httpx.AsyncClient(app=main.app, base_url="http://test") as client:
+        with pytest.raises(asyncpg.exceptions.ConnectionDoesNotExistError):
+            await client.get("/events/stream")
+
+
+@pytest.mark.asyncio
+async def test_admin_clear_reaches_other_processes(monkeypatch):
+    """T67: /admin/clear menaikkan clear_generation; proses lain mengosongkan cache saat generation berubah"""
+    import httpx
+    import main
+    
+    async def fake_clear_all_data():
+        return 6
+    
+    generations = iter([5, 6, 6])
+    
+    async def fake_get_clear_generation():
+        return next(generations)
+    
+    key = ("test.topic", "evt-cleared")
+    cache = RecentKeyCache(max_size=10)
+    monkeypatch.setattr(main, "_recent_keys", cache)
+    monkeypatch.setattr(main, "_dedup_filter", None)
+    monkeypatch.setattr(main, "_clear_generation", 5)
+    monkeypatch.setattr(main, "clear_all_data", fake_clear_all_data)
+    monkeypatch.setattr(main, "get_clear_generation", fake_get_clear_generation)
+    monkeypatch.setattr(main, "CLEAR_POLL_INTERVAL_MS", 1)
+    
+    # Proses yang menerima request: reset langsung dan mencatat generation baru
+    cache.add_many([key])
+    async with httpx.AsyncClient(app=main.app, base_url="http://test") as client:
+        resp = await client.post("/admin/clear")
+    assert resp.status_code == 200
+    assert main._clear_generation == 6
+    assert not cache.contains(key)
+    
+    # Proses lain: generation 5 -> 6 terlihat oleh clear_watcher
+    main._clear_generation = None
+    cache.add_many([key])
+    watcher = asyncio.create_task(main.clear_watcher())
+    try:
+        for _ in range(100):
+            if main._clear_generation == 5:
+                break
+            await asyncio.sleep(0.001)
+        assert cache.contains(key)
+        for _ in range(100):
+            if not cache.contains(key):
+                break
+            await asyncio.sleep(0.001)
+        assert not cache.contains(key)
+    finally:
+        watcher.cancel()
+
+
+@pytest.mark.asyncio
+async def test_server_init_schema_retries_until_database_ready(monkeypatch):
+    """T68: Launcher multi-process menunggu Postgres siap sebelum init schema"""
+    import src.database
+    from src import server
+    
+    calls = []
+    
+    async def flaky_init_pool():
+        calls.append("init_pool")
+        if calls.count("init_pool") < 3:
+            raise ConnectionRefusedError("connection refused")
+    
+    async def fake_init_db():
+        calls.append("init_db")
+    
+    async def fake_close_pool():
+        calls.append("close_pool")
+    
+    monkeypatch.setattr(src.database, "init_pool", flaky_init_pool)
+    monkeypatch.setattr(src.database, "init_db", fake_init_db)
+    monkeypatch.setattr(src.database, "close_pool", fake_close_pool)
+    monkeypatch.setattr(server, "INIT_RETRY_INTERVAL_S", 0)
+    
+    await server.init_schema()
+    assert calls == ["init_pool", "init_pool", "init_pool", "init_db", "close_pool"]
+
+
+@pytest.mark.asyncio
+async def test_dedup_filter_loaded_only_when_consulted(monkeypatch):
+    """T69: Bloom filter default hanya di consumer single dengan broker memory"""
+    import main
+    
+    cases = [
+        ("single", "memory", True),
+        ("batch", "memory", False),
+        ("single", "redis", False),
+        ("batch", "redis", False),
+    ]
+    for mode, broker, expected in cases:
+        monkeypatch.setattr(main, "CONSUMER_MODE", mode)
+        monkeypatch.setattr(main, "INGEST_BROKER", broker)
+        assert main.dedup_filter_consulted() is expected
+
+
+@pytest.mark.asyncio
+async def test_dedup_window_must_cover_partitioned_retention(monkeypatch):
+    """T70: Dedup window lebih pendek dari umur event di tabel partisi ditolak saat startup"""
+    import database
+    
+    def check(interval, retention, window, storage="dedup_store"):
+        monkeypatch.setattr(database, "EVENTS_PARTITION_INTERVAL", interval)
+        monkeypatch.setattr(database, "EVENT_RETENTION_HOURS", retention)
+        monkeypatch.setattr(database, "DEDUP_WINDOW_HOURS", window)
+        monkeypatch.setattr(database, "DEDUP_STORAGE", storage)
+        database.check_retention_config()
+    
+    # Tanpa partisi unique processed_events tetap menjaga dedup
+    check("", 168, 24)
+    check("daily", 168, 0)
+    check("daily", 168, 192)
+    check("hourly", 24, 25)
+    
+    for interval, retention, window in [("daily", 168, 24), ("daily", 168, 168), ("hourly", 24, 24), ("daily", 0, 24)]:
+        with pytest.raises(RuntimeError, match="DEDUP_WINDOW_HOURS"):
+            check(interval, retention, window)
+
+
+@pytest.mark.asyncio
+async def test_missing_partition_is_retried_not_dead_lettered(monkeypatch):
+    """T71: Insert tanpa partisi (23514) membuat partisi lalu diulang, bukan dianggap data event yang rusak"""
+    import database
+    
+    monkeypatch.setattr(database, "EVENTS_PARTITION_INTERVAL", "daily")
+    missing = asyncpg.exceptions.CheckViolationError(
+        'no partition of relation "processed_events" found for row'
+    )
+    assert database.is_missing_partition(missing)
+    assert not database.is_data_error(missing)
+    assert database.is_transient_error(missing)
+    
+    other_check = asyncpg.exceptions.CheckViolationError('new row for relation "events" violates check constraint')
+    assert database.is_data_error(other_check)
+    
+    calls = []
+    
+    async def fake_maintain_partitions():
+        calls.append("maintain")
+        return {"created": ["processed_events_p20251218"], "dropped": []}
+    
+    async def insert():
+        calls.append("insert")
+        if calls.count("insert") == 1:
+            raise missing
+        return 3
+    
+    monkeypatch.setattr(database, "maintain_partitions", fake_maintain_partitions)
+    assert await database._with_serialization_retry(insert, "Batch commit") == 3
+    assert calls == ["insert", "maintain", "insert"]
+    
+    # Masih hilang setelah maintenance: error di-raise (transient) untuk backoff di consumer
+    async def always_missing():
+        raise missing
+    
+    with pytest.raises(asyncpg.exceptions.CheckViolationError):
+        await database._with_serialization_retry(always_missing, "Batch commit")
+
+
+@pytest.mark.asyncio
+async def test_transient_error_after_partial_commit_retries_only_failed_part(monkeypatch):
+    """T72: Error transient saat bisection hanya mengulang sub-batch yang gagal; stats tidak terhitung dua kali"""
+    import main
+    
+    committed = []
+    dead_lettered = []
+    transient_raised = []
+    
+    async def fake_mark_processed_batch(events, skipped_duplicates=0):
+        ids = [event.event_id for event in events]
+        if "evt-3" in ids and len(ids) == 2 and not transient_raised:
+            # Separuh pertama [evt-0, evt-1] sudah di-commit saat koneksi putus
+            transient_raised.append(ids)
+            raise asyncpg.exceptions.ConnectionDoesNotExistError("connection was closed in the middle of operation")
+        if "evt-3" in ids:
+            raise asyncpg.exceptions.UntranslatableCharacterError("unsupported Unicode escape sequence")
+        committed.extend(ids)
+        return len(events), skipped_duplicates
+    
+    async def fake_dead_letter_events(failures):
+        dead_lettered.extend(event.event_id for event, _ in failures)
+        return len(failures)
+    
+    monkeypatch.setattr(main, "mark_processed_batch", fake_mark_processed_batch)
+    monkeypatch.setattr(main, "dead_letter_events", fake_dead_letter_events)
+    monkeypatch.setattr(main, "_recent_keys", RecentKeyCache(max_size=100))
+    monkeypatch.setattr(main, "_dedup_filter", None)
+    monkeypatch.setattr(main, "_worker_stats", [_fresh_worker_stats()])
+    monkeypatch.setattr(main, "CONSUMER_RETRY_BACKOFF_BASE_S", 0.001)
+    
+    events = [create_event(event_id=f"evt-{i}") for i in range(4)]
+    await main.commit_events(0, events)
+    
+    assert transient_raised == [["evt-2", "evt-3"]]
+    assert committed == ["evt-0", "evt-1", "evt-2"]
+    assert dead_lettered == ["evt-3"]
+    stats = main._worker_stats[0]
+    assert (stats["processed"], stats["unique_processed"], stats["duplicate_dropped"]) == (4, 3, 0)
+
+
+@pytest.mark.asyncio
+async def test_copy_staging_table_created_once_per_connection(monkeypatch):
+    """T73: staging_events dibuat di hook init pool; batch COPY tidak menjalankan DDL"""
+    import database
+    monkeypatch.setattr(database, "COPY_THRESHOLD", 2)
+    
+    async with database.get_connection() as conn:
+        assert await conn.fetchval("SELECT to_regclass('pg_temp.staging_events')") is not None
+        executed = []
+        
+        class RecordingConnection:
+            def __getattr__(self, name):
+                return getattr(conn, name)
+            
+            async def execute(self, query, *args):
+                executed.append(query)
+                return await conn.execute(query, *args)
+        
+        for round_ in range(2):
+            events = [create_event(event_id=f"evt-staging-{round_}-{i}") for i in range(3)]
+            async with conn.transaction():
+                inserted = await database._copy_insert_batch(
+                    RecordingConnection(), *[[getattr(e, field) for e in events] for field in ("topic", "event_id", "timestamp", "source", "payload")]
+                )
+            assert inserted == 3
+        assert not any("CREATE" in query for query in executed)
+    assert await get_event_count() == 6
+
+
+@pytest.mark.asyncio
+async def test_server_divides_pool_budget_across_processes(monkeypatch):
+    """T74: DB_POOL_MAX adalah budget total yang dibagi ke semua proses launcher"""
+    import src.database
+    from src import server
+    
+    monkeypatch.setattr(src.database, "DB_POOL_MIN", 5)
+    monkeypatch.setattr(src.database, "DB_POOL_MAX", 40)
+    assert server.pool_budget(4) == (5, 10)
+    assert server.pool_budget(16) == (2, 2)
+    # Budget lebih kecil dari jumlah proses: tetap satu connection per proses
+    assert server.pool_budget(64) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_orphaned_process_spools_adopted_by_primary(monkeypatch, tmp_path):
+    """T75: Spool process-<i> dengan i >= jumlah proses di-replay oleh proses 0 lalu dihapus"""
+    import main
+    
+    for index, bodies in [(0, [b"own"]), (1, [b"kept"]), (3, [b"orphan-1", b"orphan-2"])]:
+        spool = Spool(str(tmp_path / f"process-{index}"), group_commit_ms=0)
+        spool.open()
+        await spool.append(bodies)
+        await spool.close()
+    
+    monkeypatch.setattr(main, "SPOOL_DIR", str(tmp_path))
+    monkeypatch.setattr(main, "AGGREGATOR_PROCESS_INDEX", "0")
+    monkeypatch.setattr(main, "AGGREGATOR_PROCESSES", 2)
+    assert main.orphaned_spool_dirs() == [str(tmp_path / "process-3")]
+    
+    own = Spool(main._spool_dir("0"), group_commit_ms=0)
+    monkeypatch.setattr(main, "_spool", own)
+    records = own.open()
+    records += await main.adopt_orphaned_spools()
+    assert [body for _, body in records] == [b"own", b"orphan-1", b"orphan-2"]
+    assert [lsn for lsn, _ in records] == [1, 2, 3]
+    assert not (tmp_path / "process-3").exists()
+    assert (tmp_path / "process-1").exists()
+    await own.close()
+    
+    # Record yang diambil alih durable di spool proses 0 sampai di-ack
+    reopened = Spool(main._spool_dir("0"), group_commit_ms=0)
+    assert [body for _, body in reopened.open()] == [b"own", b"orphan-1", b"orphan-2"]
+    await reopened.close()
+
+
+@pytest.mark.asyncio
+async def test_events_stream_serialized_with_json_codec(monkeypatch):
+    """T76: /events/stream menulis setiap baris dengan json_codec, sama dengan GET /events"""
+    import httpx
+    import main
+    
+    monkeypatch.setattr(main, "stream_events", stream_events)
+    await mark_processed_batch([
+        create_event(topic="logs.export", event_id=f"evt-export-{i}", payload={"n": i, "big": 2 ** 70, "text": "é"})
+        for i in range(3)
+    ])
+    async with httpx.AsyncClient(app=main.app, base_url="http://test") as client:
+        response = await client.get("/events/stream", params={"topic": "logs.export"})
+    
+    assert response.status_code == 200
+    lines = response.content.decode("utf-8").splitlines()
+    events = [json_codec.loads(line) for line in lines]
+    assert [event["event_id"] for event in events] == [f"evt-export-{i}" for i in range(3)]
+    assert lines == [json_codec.dumps(event) for event in events]
+    assert events[0]["payload"]["big"] == 2 ** 70
+
+
+@pytest.mark.asyncio
+async def test_processed_at_stored_in_utc_regardless_of_session_timezone():
+    """T77: processed_at disimpan UTC walau timezone session bukan UTC; filter since ber-timezone cocok"""
+    import database
+    import main
+    
+    event = create_event(topic="logs.tz", event_id="evt-tz")
+    async with database.get_connection() as conn:
+        await conn.execute("SET TIME ZONE 'Asia/Jakarta'")
+        async with conn.transaction():
+            await database._insert_batch(conn, [event.topic], [event.event_id], [event.timestamp], [event.source], [event.payload])
+        processed_at = await conn.fetchval("SELECT processed_at FROM processed_events WHERE event_id = 'evt-tz'")
+    
+    assert abs(processed_at - datetime.utcnow()) < timedelta(minutes=1)
+    jakarta = timezone(timedelta(hours=7))
+    since = datetime.now(jakarta) - timedelta(minutes=1)
+    events, _ = await get_events_page("logs.tz", 10, since=main._to_db_time(since))
+    assert [e["event_id"] for e in events] == ["evt-tz"]
+    events, _ = await get_events_page("logs.tz", 10, since=main._to_db_time(since + timedelta(minutes=2)))
+    assert events == []
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v", "-s"])